@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+
+LIMIT_DECREASED_TEMPLATE = (
+    'Concurrency limit "{name}" decreased to {limit} ({reason})'
+)
+
+
+class Slot:
+    """Разрешение на одну операцию. Операцию можно пометить перегрузкой..."""
+
+    __slots__ = ('overload',)
+
+    def __init__(self):
+        """Создаёт разрешение без признака перегрузки..."""
+        self.overload = False
+
+    def mark_overload(self):
+        """Отмечает, что операция столкнулась с перегрузкой сервиса..."""
+        self.overload = True
+
+
+class AdaptiveLimiter:
+    """
+    Адаптивный ограничитель числа одновременных операций (AIMD)...
+    Каждая успешная операция быстрее target_latency увеличивает лимит на
+    1/limit, то есть примерно на единицу за окно из limit операций. Ошибка
+    перегрузки, медленная операция или отставание планировщика умножают
+    лимит на decrease, но не чаще раза в cooldown секунд, чтобы одна
+    волна ошибок не обрушила лимит до минимума. Операции сверх лимита
+    ждут свободного места не дольше timeout.
+    """
+
+    def __init__(self, name: str, initial: int, minimum: int, maximum: int,
+                 target_latency: float, decrease: float = 0.5,
+                 cooldown: float = None, clock=time.monotonic):
+        """Создаёт ограничитель с начальным лимитом initial..."""
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError(
+                f'Bad limits for {name}: {minimum} <= {initial} <= {maximum}'
+            )
+        self.name = name
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.decrease_factor = decrease
+        self.cooldown = target_latency if cooldown is None else cooldown
+        self.clock = clock
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._decreased_at = None
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float = None):
+        """Ждёт свободного места. Возвращает False по истечении timeout..."""
+        with self._condition:
+            self.waiting += 1
+            try:
+                acquired = self._condition.wait_for(
+                    lambda: self.in_flight < int(self.limit), timeout
+                )
+            finally:
+                self.waiting -= 1
+            if not acquired:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: float, overload: bool = False):
+        """Освобождает место и корректирует лимит по итогу операции..."""
+        with self._condition:
+            self.in_flight -= 1
+            if overload:
+                self._decrease('overload')
+            elif latency > self.target_latency:
+                self._decrease(f'latency {latency:.2f}s')
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def _decrease(self, reason):
+        now = self.clock()
+        if (self._decreased_at is not None
+                and now - self._decreased_at < self.cooldown):
+            return
+        self._decreased_at = now
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+        logging.warning(LIMIT_DECREASED_TEMPLATE.format(
+            name=self.name,
+            limit=int(self.limit),
+            reason=reason
+        ))
+
+    def overload(self, reason: str):
+        """Снижает лимит по внешнему сигналу, например, отставанию цикла..."""
+        with self._condition:
+            self._decrease(reason)
+
+    @contextmanager
+    def slot(self, timeout: float = None):
+        """
+        Выполняет операцию в пределах лимита. Возвращает Slot или None,...
+        если место не освободилось за timeout. Исключение из операции
+        считается перегрузкой, если её отметили через Slot.mark_overload.
+        """
+        if not self.acquire(timeout):
+            yield None
+            return
+        slot = Slot()
+        start = time.perf_counter()
+        try:
+            yield slot
+        finally:
+            self.release(time.perf_counter() - start, slot.overload)
+
+    def snapshot(self):
+        """Возвращает текущий лимит и загрузку для наблюдения..."""
+        with self._condition:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'rejected': self.rejected,
+            }
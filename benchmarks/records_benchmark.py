@@ -0,0 +1,95 @@
+"""
+Микробенчмарк: словари из ответа API против HomeworkRecord.
+
+Сравнивает пиковую память на хранение истории работ и скорость разбора
+ответа API: поиск статуса и имени прямо в словарях против
+parse_homeworks и тех же полей HomeworkRecord. В обоих вариантах
+сообщение форматируется одинаково и без трассировки, поэтому разница -
+это только цена построения записей. Запуск:
+python benchmarks/records_benchmark.py [N]
+"""
+import json
+import sys
+import timeit
+import tracemalloc
+from os.path import abspath, dirname
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+from records import parse_homeworks  # noqa: E402
+
+
+STATUSES = ('approved', 'reviewing', 'rejected')
+RESULT_TEMPLATE = (
+    '{name:<8} memory: {memory:>10,} B  parse: {speed:>10,.0f} hw/s'
+)
+
+
+def make_payload(size):
+    """Генерирует JSON-ответ API с заданным количеством работ..."""
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': index,
+                'status': STATUSES[index % len(STATUSES)],
+                'homework_name': f'student{index}__hw{index % 12}.zip',
+                'reviewer_comment': 'Всё нравится',
+                'date_updated': '2020-02-13T14:40:57Z',
+                'lesson_name': f'Спринт {index % 12}',
+            }
+            for index in range(size)
+        ],
+        'current_date': 1581604970,
+    })
+
+
+def render(homework_name, status):
+    """Форматирует вердикт так же, как parse_status, без трассировки..."""
+    return homework.CHANGED_HOMEWORK_STATUS_TEMPLATE.format(
+        homework_name=homework_name,
+        verdict=homework.HOMEWORK_VERDICTS[status]
+    )
+
+
+def dict_path(payload):
+    """Разбирает ответ, читая поля прямо из словарей API..."""
+    homeworks = json.loads(payload)['homeworks']
+    for item in homeworks:
+        render(item['homework_name'], item['status'])
+    return homeworks
+
+
+def record_path(payload):
+    """Разбирает ответ в кортеж HomeworkRecord..."""
+    records = parse_homeworks(json.loads(payload))
+    for record in records:
+        render(record.homework_name, record.status)
+    return records
+
+
+def measure_memory(func, payload):
+    """Возвращает память, занятую результатом func(payload)..."""
+    tracemalloc.start()
+    kept = func(payload)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return memory
+
+
+def main(size=100_000, repeat=3):
+    """Печатает память и скорость разбора для обоих вариантов..."""
+    payload = make_payload(size)
+    for name, func in (('dict', dict_path), ('record', record_path)):
+        memory = measure_memory(func, payload)
+        seconds = min(timeit.repeat(
+            lambda: func(payload), number=1, repeat=repeat
+        ))
+        print(RESULT_TEMPLATE.format(
+            name=name, memory=memory, speed=size / seconds
+        ))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,127 @@
+import logging
+import time
+
+from ratelimit import TokenBucket
+from state import load_state, save_state
+
+
+COMMAND_FAILED_TEMPLATE = 'Command {command} from chat {chat_id} failed'
+COMMAND_RATE_LIMITED_TEMPLATE = (
+    'Command {command} from chat {chat_id} ignored: rate limit exceeded'
+)
+GET_UPDATES_ERROR_TEMPLATE = 'Cannot get updates from Telegram: {error}'
+UNKNOWN_CHAT_TEMPLATE = 'Command {command} from unknown chat {chat_id} ignored'
+
+
+class CommandPoller:
+    """
+    Обработчик команд бота через long polling getUpdates...
+    Смещение обновлений хранится в файле offset_path и перечитывается при
+    каждом переходе из standby в активный режим, поэтому после перезапуска
+    или смены лидера одно и то же обновление не обрабатывается дважды.
+    Команды принимаются только из allowed_chats, а частота команд каждого
+    чата ограничена собственным ведром токенов; команды сверх лимита
+    игнорируются. Ответы отправляются функцией send(chat_id, text), по
+    умолчанию - напрямую через bot.send_message.
+    """
+
+    def __init__(self, bot, handlers: dict, offset_path: str,
+                 allowed_chats, rate: float, burst: int, timeout: int,
+                 send=None):
+        """
+        Создаёт обработчик. Словарь handlers сопоставляет команде...
+        функцию, которая принимает chat_id и возвращает текст ответа.
+        """
+        self.bot = bot
+        self.handlers = handlers
+        self.offset_path = offset_path
+        self.allowed_chats = {str(chat_id) for chat_id in allowed_chats}
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+        self.send = send or (
+            lambda chat_id, text: bot.send_message(chat_id=chat_id, text=text)
+        )
+        self.offset = None
+        self.load_offset()
+        self._buckets = {}
+
+    def load_offset(self):
+        """Перечитывает смещение обновлений из offset_path..."""
+        self.offset = load_state(
+            self.offset_path, {'offset': None}
+        )['offset']
+
+    def _allowed(self, command, chat_id):
+        if chat_id not in self.allowed_chats:
+            logging.info(UNKNOWN_CHAT_TEMPLATE.format(
+                command=command,
+                chat_id=chat_id
+            ))
+            return False
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(
+                self.rate, self.burst
+            )
+        if not bucket.try_acquire():
+            logging.info(COMMAND_RATE_LIMITED_TEMPLATE.format(
+                command=command,
+                chat_id=chat_id
+            ))
+            return False
+        return True
+
+    def handle(self, message):
+        """Выполняет команду из сообщения и отправляет ответ..."""
+        if message is None or not message.text:
+            return
+        command = message.text.split()[0].split('@')[0].lower()
+        handler = self.handlers.get(command)
+        chat_id = str(message.chat_id)
+        if handler is None or not self._allowed(command, chat_id):
+            return
+        try:
+            self.send(chat_id, handler(chat_id))
+        except Exception:
+            logging.exception(COMMAND_FAILED_TEMPLATE.format(
+                command=command,
+                chat_id=chat_id
+            ))
+
+    def poll_once(self):
+        """Получает и обрабатывает одну пачку обновлений..."""
+        updates = self.bot.get_updates(
+            offset=self.offset,
+            timeout=self.timeout,
+            allowed_updates=['message'],
+        )
+        for update in updates:
+            self.offset = update.update_id + 1
+            save_state(self.offset_path, {'offset': self.offset})
+            self.handle(update.message)
+
+    def run(self, is_active, idle_time: float):
+        """
+        Бесконечный цикл обработки команд для фонового потока...
+        Пока is_active() возвращает False (например, экземпляр в режиме
+        standby), обновления не запрашиваются; после возврата в активный
+        режим смещение перечитывается из файла, куда его мог сдвинуть
+        другой экземпляр.
+        """
+        was_active = True
+        while True:
+            if not is_active():
+                was_active = False
+                time.sleep(idle_time)
+                continue
+            if not was_active:
+                self.load_offset()
+                was_active = True
+            try:
+                self.poll_once()
+            except Exception as error:
+                logging.warning(GET_UPDATES_ERROR_TEMPLATE.format(
+                    error=error
+                ))
+                time.sleep(idle_time)
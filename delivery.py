@@ -0,0 +1,287 @@
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from exceptions import DeliveryDeferredError
+from state import load_state, save_state
+
+
+DEAD_DIR = 'dead'
+DELIVERED_FILE = 'delivered.json'
+LOCK_FILE = 'queue.lock'
+PENDING_DIR = 'pending'
+MAX_ATTEMPTS = 10
+DEAD_LETTER_TEMPLATE = (
+    'Delivery of {key} failed {attempts} times. Message moved to {path}'
+)
+DELIVERY_DEFERRED_TEMPLATE = (
+    'Delivery of {key} deferred by the recipient. Retrying in {delay:.0f}s'
+)
+DELIVERY_CRASHED_TEMPLATE = (
+    'Delivery worker failed. Retrying in {delay:.0f}s'
+)
+DELIVERY_FAILED_TEMPLATE = (
+    'Delivery of {key} failed (attempt {attempts}). Retrying in {delay:.0f}s'
+)
+DUPLICATE_MESSAGE_TEMPLATE = 'Message {key} is already queued or delivered'
+QUEUED_MESSAGE_TEMPLATE = 'Message {key} queued for delivery'
+
+
+def idempotency_key(*parts):
+    """Ключ идемпотентности сообщения: хэш его составных частей..."""
+    return hashlib.sha256(
+        '\x1f'.join(str(part) for part in parts).encode()
+    ).hexdigest()[:32]
+
+
+class DeliveryQueue:
+    """
+    Очередь исходящих сообщений на диске с доставкой at-least-once...
+    Каждое сообщение атомарно записывается отдельным файлом до первой
+    попытки отправки и удаляется только после успешной отправки. Ключи
+    последних delivered_limit доставленных сообщений хранятся на диске,
+    поэтому повторная постановка того же сообщения игнорируется.
+    Сообщение, которое не удалось отправить max_attempts раз, переносится
+    в каталог dead и больше не задерживает очередь. Изменения очереди
+    выполняются под flock, поэтому список доставленных сообщений всегда
+    читается с диска и общий для всех экземпляров бота.
+    """
+
+    def __init__(self, directory: str, delivered_limit: int = 1000,
+                 max_attempts: int = MAX_ATTEMPTS):
+        """Создаёт очередь в каталоге directory..."""
+        self.directory = directory
+        self.pending_dir = os.path.join(directory, PENDING_DIR)
+        self.dead_dir = os.path.join(directory, DEAD_DIR)
+        self.delivered_path = os.path.join(directory, DELIVERED_FILE)
+        self.lock_path = os.path.join(directory, LOCK_FILE)
+        self.delivered_limit = delivered_limit
+        self.max_attempts = max_attempts
+        os.makedirs(self.pending_dir, exist_ok=True)
+        os.makedirs(self.dead_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.delivered = 0
+        self.failures = 0
+        self.dead = 0
+
+    @contextmanager
+    def _locked(self):
+        with self._lock, open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _message_files(directory):
+        return sorted(
+            name for name in os.listdir(directory) if name.endswith('.json')
+        )
+
+    def _pending_files(self):
+        return self._message_files(self.pending_dir)
+
+    def _delivered_keys(self):
+        return load_state(self.delivered_path, {'keys': []})['keys']
+
+    def _is_known(self, key):
+        suffix = f'-{key}.json'
+        return key in self._delivered_keys() or any(
+            name.endswith(suffix)
+            for name in self._pending_files()
+            + self._message_files(self.dead_dir)
+        )
+
+    def enqueue(self, message: str, key: str, trace=None):
+        """
+        Сохраняет сообщение в очереди. Возвращает True, если сообщение...
+        надёжно сохранено сейчас или было поставлено/доставлено ранее.
+        """
+        with self._locked():
+            if self._is_known(key):
+                logging.debug(DUPLICATE_MESSAGE_TEMPLATE.format(key=key))
+                return True
+            save_state(
+                os.path.join(self.pending_dir, f'{time.time_ns()}-{key}.json'),
+                {
+                    'key': key,
+                    'message': message,
+                    'created_at': time.time(),
+                    'attempts': 0,
+                    'trace': trace,
+                }
+            )
+        logging.info(QUEUED_MESSAGE_TEMPLATE.format(key=key))
+        return True
+
+    def _mark_delivered(self, path, key):
+        delivered = self._delivered_keys()
+        if key not in delivered:
+            delivered.append(key)
+            save_state(
+                self.delivered_path,
+                {'keys': delivered[-self.delivered_limit:]}
+            )
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        self.delivered += 1
+
+    def _mark_failed(self, name, record):
+        path = os.path.join(self.pending_dir, name)
+        if not os.path.exists(path):
+            return True
+        record['attempts'] += 1
+        self.failures += 1
+        if record['attempts'] < self.max_attempts:
+            save_state(path, record)
+            return False
+        dead_path = os.path.join(self.dead_dir, name)
+        os.replace(path, dead_path)
+        self.dead += 1
+        logging.error(DEAD_LETTER_TEMPLATE.format(
+            key=record['key'],
+            attempts=record['attempts'],
+            path=dead_path
+        ))
+        return True
+
+    def flush(self, send):
+        """
+        Отправляет сообщения в порядке постановки, вызывая...
+        send(message, record). Блокировка очереди берётся только на чтение
+        и изменение файлов, сама отправка идёт без неё. Останавливается на
+        первой неудаче, чтобы не нарушать порядок, и возвращает
+        неотправленную запись; если очередь опустела или все неудачные
+        сообщения перенесены в dead, возвращает None. Если send вызывает
+        DeliveryDeferredError, попытка не засчитывается, а в записи
+        возвращается запрошенная задержка retry_after. Сообщения, которые
+        уже доставил другой экземпляр (например, при смене лидера), не
+        отправляются повторно.
+        """
+        with self._flush_lock:
+            with self._locked():
+                names = self._pending_files()
+            for name in names:
+                path = os.path.join(self.pending_dir, name)
+                with self._locked():
+                    record = load_state(path, {})
+                    if record.get('key') in self._delivered_keys():
+                        self._mark_delivered(path, record['key'])
+                        continue
+                if 'key' not in record:
+                    continue
+                try:
+                    sent = send(record['message'], record)
+                except DeliveryDeferredError as error:
+                    record['retry_after'] = error.retry_after
+                    return record
+                with self._locked():
+                    if sent:
+                        self._mark_delivered(path, record['key'])
+                        continue
+                    if self._mark_failed(name, record):
+                        continue
+                return record
+            return None
+
+    def stats(self):
+        """Возвращает размер очереди и счётчики доставки..."""
+        with self._locked():
+            return {
+                'pending': len(self._pending_files()),
+                'delivered': self.delivered,
+                'failures': self.failures,
+                'dead': self.dead,
+            }
+
+
+class DeliveryWorker:
+    """
+    Фоновая доставка сообщений из DeliveryQueue...
+    Повторяет неудачные отправки независимо от цикла опроса с
+    экспоненциальной задержкой от retry_time до max_retry_time; если
+    получатель сам назвал задержку (retry_after), ждёт её. Длительность
+    отправок накапливается и возвращается stats(), потому что доставка
+    идёт вне итерации цикла опроса и не попадает в её тайминги.
+    """
+
+    def __init__(self, queue: DeliveryQueue, send,
+                 retry_time: float, max_retry_time: float):
+        """Создаёт доставщик, отправляющий сообщения функцией send..."""
+        self.queue = queue
+        self.send = send
+        self.retry_time = retry_time
+        self.max_retry_time = max_retry_time
+        self.delay = retry_time
+        self.sends = 0
+        self.send_seconds = 0.0
+        self._wakeup = threading.Event()
+
+    def _send(self, message, record):
+        start = time.perf_counter()
+        try:
+            return self.send(message, record)
+        finally:
+            self.sends += 1
+            self.send_seconds += time.perf_counter() - start
+
+    def wake(self):
+        """Просит доставщик немедленно разобрать очередь..."""
+        self._wakeup.set()
+
+    def run_once(self):
+        """Разбирает очередь и пересчитывает задержку повтора..."""
+        failed = self.queue.flush(self._send)
+        if failed is None:
+            self.delay = self.retry_time
+            return True
+        if 'retry_after' in failed:
+            self.delay = max(failed['retry_after'], self.retry_time)
+            logging.warning(DELIVERY_DEFERRED_TEMPLATE.format(
+                key=failed['key'],
+                delay=self.delay
+            ))
+            return False
+        logging.warning(DELIVERY_FAILED_TEMPLATE.format(
+            key=failed['key'],
+            attempts=failed['attempts'],
+            delay=self.delay
+        ))
+        self.delay = min(self.delay * 2, self.max_retry_time)
+        return False
+
+    def stats(self):
+        """Возвращает число отправок и их среднюю длительность..."""
+        return {
+            'sends': self.sends,
+            'avg_send_seconds': (
+                round(self.send_seconds / self.sends, 4)
+                if self.sends else None
+            ),
+        }
+
+    def run(self, is_active):
+        """
+        Бесконечный цикл доставки для фонового потока. Ошибки разбора...
+        очереди (например, OSError при записи на диск) пишутся в лог и не
+        останавливают поток: разбор повторяется с увеличенной задержкой.
+        """
+        while True:
+            if is_active():
+                try:
+                    self.run_once()
+                except Exception:
+                    self.delay = min(self.delay * 2, self.max_retry_time)
+                    logging.exception(DELIVERY_CRASHED_TEMPLATE.format(
+                        delay=self.delay
+                    ))
+            self._wakeup.wait(self.delay)
+            self._wakeup.clear()
@@ -0,0 +1,304 @@
+"""
+Журнал переходов статусов домашних работ.
+
+Журнал только дописывается: одна строка - один переход в виде json-массива
+[recorded_at, updated_at, cohort, homework_name, from_status, to_status].
+Рядом хранятся разреженный индекс (.idx: номер события, смещение, время
+записи каждого index_step-го события) и снимок агрегатов (.agg.json),
+который сохраняется раз в snapshot_step событий; события после снимка
+догоняются по хвосту журнала. Снимок не хранит историю отдельных работ:
+только работы, которые сейчас на проверке, поэтому его размер не растёт
+с числом событий. Запись идёт под flock на файле .lock,
+поэтому журнал можно вести из нескольких экземпляров бота.
+
+Выгрузка в CSV: python eventlog.py export [--since TS] [--output FILE]
+Агрегаты: python eventlog.py stats
+"""
+import argparse
+import csv
+import copy
+import fcntl
+import json
+import logging
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from os import getenv
+from os.path import abspath, dirname, join
+
+from state import load_state, save_state
+
+
+DEFAULT_LOG_PATH = join(dirname(abspath(__file__)), 'homework.py.events')
+CSV_HEADER = (
+    'recorded_at', 'updated_at', 'cohort', 'homework_name',
+    'from_status', 'to_status',
+)
+Event = namedtuple('Event', CSV_HEADER)
+DATE_UPDATED_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+INDEX_STEP = 1000
+SNAPSHOT_STEP = 100
+REVIEWING_STATUS = 'reviewing'
+VERDICT_STATUSES = ('approved', 'rejected')
+AGGREGATES_VERSION = 2
+EMPTY_AGGREGATES = {
+    'version': AGGREGATES_VERSION,
+    'events': 0,
+    'offset': 0,
+    'reviewing_seconds': 0.0,
+    'reviews': 0,
+    'cohorts': {},
+    'reviewing': {},
+}
+BAD_EVENT_LINE_TEMPLATE = 'Skipping corrupted event at offset {offset}'
+
+
+def parse_date_updated(date_updated):
+    """
+    Переводит date_updated из ответа API в Unix-время...
+    Возвращает None, если дата отсутствует или имеет другой формат.
+    """
+    try:
+        return datetime.strptime(date_updated, DATE_UPDATED_FORMAT).replace(
+            tzinfo=timezone.utc
+        ).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class EventLog:
+    """
+    Журнал переходов с инкрементальными агрегатами...
+    record() записывает переход, только если новый статус работы
+    отличается от переданного прежнего, и сразу обновляет агрегаты:
+    суммарное время в статусе reviewing и число одобрений и отказов по
+    когортам. Перед записью агрегаты догоняются по событиям, которые
+    дописали другие экземпляры, поэтому агрегаты резервного экземпляра,
+    ставшего лидером, не расходятся с журналом.
+    """
+
+    def __init__(self, path: str, index_step: int = INDEX_STEP,
+                 snapshot_step: int = SNAPSHOT_STEP):
+        """
+        Открывает журнал path, догоняя агрегаты по хвосту журнала...
+        Открытие не меняет ни журнал, ни индекс, ни снимок агрегатов.
+        """
+        self.path = path
+        self.index_path = path + '.idx'
+        self.aggregates_path = path + '.agg.json'
+        self.lock_path = path + '.lock'
+        self.index_step = index_step
+        self.snapshot_step = snapshot_step
+        self._lock = threading.Lock()
+        self.aggregates = load_state(
+            self.aggregates_path, copy.deepcopy(EMPTY_AGGREGATES)
+        )
+        if self.aggregates.get('version') != AGGREGATES_VERSION:
+            self.aggregates = copy.deepcopy(EMPTY_AGGREGATES)
+        with self._flock(fcntl.LOCK_SH):
+            self._catch_up()
+
+    @contextmanager
+    def _flock(self, operation):
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _catch_up(self):
+        for _, event in iter_events(self.path, self.aggregates['offset']):
+            self._apply(event)
+        self.aggregates['offset'] = self._size()
+
+    def _size(self):
+        try:
+            with open(self.path, 'rb') as log_file:
+                return log_file.seek(0, 2)
+        except FileNotFoundError:
+            return 0
+
+    def _index(self, offset, event):
+        if self.aggregates['events'] % self.index_step == 0:
+            with open(self.index_path, 'a', encoding='utf-8') as index_file:
+                index_file.write(
+                    f'{self.aggregates["events"]}\t{offset}\t'
+                    f'{event.recorded_at}\n'
+                )
+
+    def _apply(self, event):
+        aggregates = self.aggregates
+        reviewing = aggregates['reviewing']
+        started_at = reviewing.pop(event.homework_name, None)
+        if event.from_status == REVIEWING_STATUS and started_at is not None:
+            aggregates['reviewing_seconds'] += max(
+                event.updated_at - started_at, 0
+            )
+            aggregates['reviews'] += 1
+        if event.to_status == REVIEWING_STATUS:
+            reviewing[event.homework_name] = event.updated_at
+        if event.to_status in VERDICT_STATUSES:
+            counters = aggregates['cohorts'].setdefault(
+                event.cohort, dict.fromkeys(VERDICT_STATUSES, 0)
+            )
+            counters[event.to_status] += 1
+        aggregates['events'] += 1
+
+    def record(self, homework_name: str, status: str, cohort: str,
+               date_updated: str = None, from_status: str = None):
+        """
+        Записывает переход работы из from_status в status...
+        Последний статус каждой работы хранит вызывающий (TenantState),
+        журнал помнит только работы, которые сейчас на проверке. Возвращает
+        записанное событие Event или None, если статус не менялся.
+        """
+        if from_status == status:
+            return None
+        with self._lock, self._flock(fcntl.LOCK_EX):
+            self._catch_up()
+            return self._record(
+                homework_name, status, cohort, date_updated, from_status
+            )
+
+    def _record(self, homework_name, status, cohort, date_updated,
+                from_status):
+        recorded_at = round(time.time(), 3)
+        event = Event(
+            recorded_at,
+            parse_date_updated(date_updated) or recorded_at,
+            cohort,
+            homework_name,
+            from_status or '',
+            status,
+        )
+        line = json.dumps(event, ensure_ascii=False) + '\n'
+        with open(self.path, 'ab') as log_file:
+            offset = log_file.seek(0, 2)
+            log_file.write(line.encode('utf-8'))
+        self._index(offset, event)
+        self._apply(event)
+        self.aggregates['offset'] = offset + len(line.encode('utf-8'))
+        if self.aggregates['events'] % self.snapshot_step == 0:
+            save_state(self.aggregates_path, self.aggregates)
+        return event
+
+    def stats(self):
+        """Возвращает агрегаты и число работ, которые сейчас на проверке..."""
+        with self._lock, self._flock(fcntl.LOCK_SH):
+            self._catch_up()
+        aggregates = self.aggregates
+        cohorts = {}
+        for cohort, counters in aggregates['cohorts'].items():
+            verdicts = sum(counters.values())
+            cohorts[cohort] = dict(
+                counters,
+                approve_rate=round(counters['approved'] / verdicts, 4),
+                reject_rate=round(counters['rejected'] / verdicts, 4),
+            )
+        reviews = aggregates['reviews']
+        return {
+            'events': aggregates['events'],
+            'in_review': len(aggregates['reviewing']),
+            'reviews': reviews,
+            'avg_reviewing_seconds': (
+                round(aggregates['reviewing_seconds'] / reviews, 1)
+                if reviews else None
+            ),
+            'cohorts': cohorts,
+        }
+
+
+def iter_events(path: str, offset: int = 0):
+    """
+    Лениво читает события журнала начиная со смещения offset...
+    Возвращает пары (смещение, Event); память не зависит от размера
+    журнала. Повреждённые строки пропускаются.
+    """
+    try:
+        log_file = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with log_file:
+        log_file.seek(offset)
+        for line in log_file:
+            try:
+                event = Event(*json.loads(line))
+            except (ValueError, TypeError):
+                logging.warning(BAD_EVENT_LINE_TEMPLATE.format(
+                    offset=offset
+                ))
+            else:
+                yield offset, event
+            offset += len(line)
+
+
+def seek_offset(path: str, since: float):
+    """
+    По разреженному индексу журнала path находит смещение, с которого...
+    начинаются события, записанные не раньше since.
+    """
+    offset = 0
+    try:
+        with open(path + '.idx', encoding='utf-8') as index_file:
+            for line in index_file:
+                _, point, recorded_at = line.split('\t')
+                if float(recorded_at) >= since:
+                    break
+                offset = int(point)
+    except FileNotFoundError:
+        pass
+    return offset
+
+
+def export_csv(path: str, output, since: float = None):
+    """
+    Потоково выгружает события журнала path в CSV. Возвращает число строк...
+    Журнал только читается: индекс и снимок агрегатов не меняются.
+    """
+    writer = csv.writer(output)
+    writer.writerow(CSV_HEADER)
+    count = 0
+    offset = seek_offset(path, since) if since is not None else 0
+    for _, event in iter_events(path, offset):
+        if since is not None and event.recorded_at < since:
+            continue
+        writer.writerow(event)
+        count += 1
+    return count
+
+
+def main(argv=None):
+    """Точка входа командной строки..."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        '--log', default=getenv('EVENT_LOG_PATH', DEFAULT_LOG_PATH),
+        help='path to the event log'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help='stream events as CSV')
+    export.add_argument(
+        '--since', type=float, help='Unix time of the first event'
+    )
+    export.add_argument('--output', help='CSV file, stdout by default')
+    commands.add_parser('stats', help='print aggregates as json')
+    args = parser.parse_args(argv)
+    if args.command == 'stats':
+        json.dump(
+            EventLog(args.log).stats(), sys.stdout, ensure_ascii=False,
+            indent=2
+        )
+        print()
+        return
+    if args.output is None:
+        export_csv(args.log, sys.stdout, args.since)
+        return
+    with open(args.output, 'w', newline='', encoding='utf-8') as output:
+        export_csv(args.log, output, args.since)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,3 +10,30 @@ class JsonDetectedResponseError(ConnectionError):
     Кастомный класс для исключений, связанных с наличием в ...
     json ключей, указывающих на ошибки
     """
+
+
+class HomeworkFormatError(KeyError):
+    """
+    Кастомный класс для исключений, вызываемых при ...
+    отсутствии обязательного ключа в описании домашней работы
+    """
+
+
+class BackpressureError(ConnectionError):
+    """
+    Кастомный класс для исключений, вызываемых, когда ...
+    адаптивный лимит одновременных операций не освободился вовремя
+    """
+
+
+class DeliveryDeferredError(ConnectionError):
+    """
+    Кастомный класс для исключений, вызываемых, когда ...
+    получатель просит повторить отправку не раньше чем через retry_after
+    секунд
+    """
+
+    def __init__(self, retry_after: float):
+        """Сохраняет запрошенную задержку повтора retry_after..."""
+        super().__init__(f'Retry after {retry_after}s')
+        self.retry_after = retry_after
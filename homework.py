@@ -1,13 +1,35 @@
+from functools import partial
 import logging
 from os import getenv
+from os.path import join
 from sys import stdout
+import threading
 import time
 
 from dotenv import load_dotenv
 import requests
 from telegram import Bot
+from telegram.error import NetworkError, RetryAfter
 
-from exceptions import JsonDetectedResponseError, WrongHttpCodeError
+from adaptive import AdaptiveLimiter
+from commands import CommandPoller
+from delivery import DeliveryQueue, DeliveryWorker, idempotency_key
+from eventlog import EventLog
+from exceptions import (
+    BackpressureError, DeliveryDeferredError, HomeworkFormatError,
+    JsonDetectedResponseError, WrongHttpCodeError
+)
+from ingest import IngestServer
+from leader import LeaderLease, LEASE_ACQUIRED_TEMPLATE, LEASE_LOST_TEMPLATE
+from profiling import LoopProfiler
+from ratelimit import make_bucket
+from records import (
+    HomeworkRecord, MISSING_HOMEWORK_KEY_TEMPLATE, parse_homeworks,
+    WRONG_TYPE_TEMPLATE
+)
+from singleflight import SingleFlight
+from state import TenantStateCache
+import tracing
 
 
 load_dotenv(override=True)
@@ -25,13 +47,101 @@ HOMEWORK_VERDICTS = {
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
 LOG_PATH = __file__ + '.log'
+# Общий бюджет запросов к ENDPOINT. Если задан PRACTICUM_RATE_STATE_PATH,
+# бюджет делят все процессы, использующие этот файл
+PRACTICUM_RPS = float(getenv('PRACTICUM_RPS', 2))
+PRACTICUM_BURST = int(getenv('PRACTICUM_BURST', 10))
+PRACTICUM_RATE_STATE_PATH = getenv('PRACTICUM_RATE_STATE_PATH')
+RATE_LIMITER = make_bucket(
+    PRACTICUM_RPS, PRACTICUM_BURST, PRACTICUM_RATE_STATE_PATH
+)
+# Адаптивные (AIMD) лимиты одновременных запросов к API и отправок в
+# Telegram. Лимит растёт, пока операции укладываются в *_TARGET_LATENCY,
+# и уменьшается вдвое при перегрузке (429/5xx, сетевые ошибки), медленных
+# ответах или отставании цикла опроса больше LOOP_LAG_THRESHOLD секунд
+FETCH_CONCURRENCY = int(getenv('FETCH_CONCURRENCY', 2))
+FETCH_CONCURRENCY_MAX = int(getenv('FETCH_CONCURRENCY_MAX', 8))
+FETCH_TARGET_LATENCY = float(getenv('FETCH_TARGET_LATENCY', 5))
+SEND_CONCURRENCY = int(getenv('SEND_CONCURRENCY', 2))
+SEND_CONCURRENCY_MAX = int(getenv('SEND_CONCURRENCY_MAX', 8))
+SEND_TARGET_LATENCY = float(getenv('SEND_TARGET_LATENCY', 3))
+SLOT_TIMEOUT = float(getenv('SLOT_TIMEOUT', 30))
+LOOP_LAG_THRESHOLD = float(getenv('LOOP_LAG_THRESHOLD', 5))
+OVERLOAD_HTTP_CODES = (429, 500, 502, 503, 504)
+FETCH_LIMITER = AdaptiveLimiter(
+    'fetch', FETCH_CONCURRENCY, 1, FETCH_CONCURRENCY_MAX, FETCH_TARGET_LATENCY
+)
+SEND_LIMITER = AdaptiveLimiter(
+    'send', SEND_CONCURRENCY, 1, SEND_CONCURRENCY_MAX, SEND_TARGET_LATENCY
+)
+# Опрос API откладывается, пока в очереди доставки больше
+# DELIVERY_HIGH_WATERMARK сообщений
+DELIVERY_HIGH_WATERMARK = int(getenv('DELIVERY_HIGH_WATERMARK', 100))
+# Одновременные запросы с одинаковыми токеном и from_date (цикл опроса,
+# команда /status) объединяются в один HTTP-запрос
+FETCHES = SingleFlight()
+# Состояние опроса сохраняется в STATE_DIR после каждой итерации, чтобы
+# перезапуск или резервный экземпляр продолжили с того же места без
+# повторных сообщений. В памяти держится не более STATE_CACHE_SIZE
+# состояний, остальные подгружаются с диска по требованию
+STATE_DIR = getenv('STATE_DIR', __file__ + '.state')
+STATE_CACHE_SIZE = int(getenv('STATE_CACHE_SIZE', 1000))
+# Режим active/standby: экземпляры с одним LEADER_LEASE_PATH выбирают
+# лидера через файл аренды, остальные ждут её истечения
+LEADER_LEASE_PATH = getenv('LEADER_LEASE_PATH')
+LEADER_LEASE_TTL = float(getenv('LEADER_LEASE_TTL', 30))
+LEADER_CHECK_TIME = float(getenv('LEADER_CHECK_TIME', 2))
+# Профилирование цикла: PROFILE_ITERATIONS включает его при старте,
+# сигнал SIGUSR1 - на PROFILE_SIGNAL_ITERATIONS итераций во время работы
+PROFILE_ITERATIONS = int(getenv('PROFILE_ITERATIONS', 0))
+PROFILE_SIGNAL_ITERATIONS = int(getenv('PROFILE_SIGNAL_ITERATIONS', 10))
+PROFILE_PATH_TEMPLATE = getenv(
+    'PROFILE_PATH_TEMPLATE', __file__ + '.{timestamp}.prof'
+)
+PROFILER = LoopProfiler(PROFILE_PATH_TEMPLATE, PROFILE_SIGNAL_ITERATIONS)
+# Очередь доставки: сообщения сохраняются на диск до отправки и
+# переотправляются отдельным потоком, не задерживая опрос API. После
+# DELIVERY_MAX_ATTEMPTS неудач сообщение переносится в DELIVERY_DIR/dead
+DELIVERY_DIR = getenv('DELIVERY_DIR', __file__ + '.outbox')
+DELIVERY_RETRY_TIME = float(getenv('DELIVERY_RETRY_TIME', 5))
+DELIVERY_MAX_RETRY_TIME = float(getenv('DELIVERY_MAX_RETRY_TIME', 300))
+DELIVERY_MAX_ATTEMPTS = int(getenv('DELIVERY_MAX_ATTEMPTS', 10))
+# Приём статусов по HTTP: если задан INGEST_PORT, бот принимает списки
+# работ на http://INGEST_HOST:INGEST_PORT/homeworks и сразу отправляет
+# вердикты, а опрос API выполняется раз в INGEST_RECONCILE_TIME секунд
+# для сверки. Пока приёмник не запущен (например, порт ещё занят прежним
+# лидером), API опрашивается раз в RETRY_TIME
+INGEST_PORT = getenv('INGEST_PORT')
+INGEST_HOST = getenv('INGEST_HOST', '127.0.0.1')
+INGEST_TOKEN = getenv('INGEST_TOKEN')
+INGEST_RECONCILE_TIME = int(getenv('INGEST_RECONCILE_TIME', 3600))
+# Команда /status: ответ из кэша последнего проверенного ответа API,
+# запрос к API - только если кэш старше STATUS_MAX_AGE секунд
+STATUS_COMMAND_ENABLED = getenv('STATUS_COMMAND_ENABLED', '1') == '1'
+STATUS_MAX_AGE = float(getenv('STATUS_MAX_AGE', 60))
+STATUS_COMMAND_RATE = float(getenv('STATUS_COMMAND_RATE', 0.1))
+STATUS_COMMAND_BURST = int(getenv('STATUS_COMMAND_BURST', 3))
+STATUS_POLL_TIMEOUT = int(getenv('STATUS_POLL_TIMEOUT', 30))
+STATUS_OFFSET_FILE = 'telegram_offset.json'
+# Журнал переходов статусов для аналитики сроков проверки (см. eventlog.py)
+EVENT_LOG_PATH = getenv('EVENT_LOG_PATH', __file__ + '.events')
+COHORT = getenv('COHORT', 'default')
+# Трассы итераций опроса в формате OTLP/JSON, по span на строку. Выгрузка
+# включается, только если задан TRACE_EXPORT_PATH (файл не ротируется),
+# trace_id в логе пишется всегда
+TRACE_EXPORT_PATH = getenv('TRACE_EXPORT_PATH')
 # Шаблоны сообщений и записей лога
+BACKPRESSURE_ERROR_TEMPLATE = (
+    'No free "{name}" slot within {timeout}s. Limits: {limits}'
+)
 BAD_ENV_VAR_ERROR_TEMPLATE = (
     'Unexisting or empty environment variables were found: {vars}'
 )
 BAD_SEND_MESSAGE_TEMPLATE = (
     'Cannot send message: "{message}" to chat ({chat_id}). Error: {error}.'
 )
+CACHED_STATUS_TEMPLATE = 'Статусы работ на {checked_at}:\n{statuses}'
+CACHED_STATUS_LINE_TEMPLATE = '"{homework_name}": {verdict}'
 CHANGED_HOMEWORK_STATUS_TEMPLATE = (
     'Изменился статус проверки работы "{homework_name}". {verdict}'
 )
@@ -40,29 +150,49 @@ CONNECTION_ERROR_TEMPLATE = (
     'DETAILS. Headers: {headers}. Params: {params}. '
     'Error message: {error}'
 )
+DEFERRED_POLL_TEMPLATE = (
+    'Poll deferred: {pending} messages wait for delivery (limit {limit})'
+)
+EVENT_LOG_ERROR_TEMPLATE = 'Cannot record transition to {path}: {error}'
+INGEST_START_ERROR_TEMPLATE = (
+    'Cannot start ingest endpoint: {error}. Polling every {retry_time}s '
+    'and retrying on the next iteration'
+)
 LAST_FRONTIER_ERROR_TEMPLATE = (
     'An error occured during the itteration. Error text: {error}'
 )
+LOOP_LAG_TEMPLATE = 'loop lag {lag:.1f}s'
 OK_SEND_MESSAGE_TEMPLATE = (
     'Message: "{message}" successfully send to chat ({chat_id})'
 )
+RATE_LIMIT_DEFERRED_TEMPLATE = (
+    'Request to {url} deferred by {wait:.3f}s to keep the rate budget. '
+    'Limiter stats: {stats}'
+)
 RESPONSE_ERROR_IN_JSON_TEMPLATE = (
     'An error was found in json response from {url} '
     'DETAILS: Headers: {headers}. Parameters: {params} '
     'The error detected in key: {error_key}. Error description: "{error}"'
 )
+RUNTIME_STATS_TEMPLATE = 'Runtime stats: {stats}'
+STANDBY_WARMUP_ERROR_TEMPLATE = 'Cannot warm up bot in standby: {error}'
+STATUS_REFRESH_ERROR_TEMPLATE = (
+    'Cannot refresh statuses for /status, answering from cache: {error}'
+)
+TRANSITION_TEMPLATE = (
+    'Homework "{homework_name}" changed status: {from_status} -> {to_status}'
+)
 UNKNOWN_HOMEWORK_STATUS_TEMPLATE = 'Status "{homework_status}" is unknown'
 WRONG_HTTP_RESPONSE_ERROR_TEMPLATE = (
     'Wrong HTTP response code from {url}. '
     'Got: {code}. Expected: {expected_code}. '
     'Details. HEADERS: {headers}, PARAMETERS: {params}'
 )
-WRONG_TYPE_MESSAGE_TEMPLATE = (
-    'Wrong datatype for {object} '
-    'Got: {got}. Expected: {expected}.'
-)
 
 BOT_INIT_ERR_MESSAGE = 'Error durining bot initializing. Check telegram token'
+NO_CACHED_STATUSES_TEMPLATE = (
+    'Данных о работах пока нет. Последняя проверка: {checked_at}'
+)
 NO_CHECKED_WORKS_MESSAGE = 'No new checked homeworks were found'
 NO_GET_API_ANSWER_RESPONSE = 'Null or empty response from get_api_answer.'
 NO_HOMEWORKS_KEY_IN_RESPONSE = (
@@ -71,57 +201,119 @@ NO_HOMEWORKS_KEY_IN_RESPONSE = (
 SEND_ERROR_INFO_EXCEPTION = (
     f'An error occured during send error info to chat ({TELEGRAM_CHAT_ID})'
 )
+STANDBY_BOT_MESSAGE = 'Starting in standby mode. Waiting for lease {path}'
 START_BOT_MESSAGE = 'Starting bot...'
 STOP_BOT_MESSAGE = ' Stoping bot... Reasone: Bad environment variables'
 # текстовое описание объектов для подстановки в сообщение
 CHECK_RESPONSE_ARGUMENT_OBJECT = 'check_response argument'
 HOMEWORKS_INFO_OBJECT = 'homeworks info'
+NEVER_CHECKED = 'никогда'
+STATUS_TIME_FORMAT = '%d.%m.%Y %H:%M:%S'
 
 
 def logger_init():
     """Инициализация настроек логирования..."""
+    handlers = [
+        logging.StreamHandler(stdout),
+        logging.FileHandler(LOG_PATH),
+    ]
+    for handler in handlers:
+        handler.addFilter(tracing.TraceContextFilter())
     logging.basicConfig(
-        format='%(asctime)s [%(levelname)s]  %(message)s',
+        format='%(asctime)s [%(levelname)s] [trace=%(trace_id)s]  %(message)s',
         level=logging.DEBUG,
-        handlers=[
-            logging.StreamHandler(stdout),
-            logging.FileHandler(LOG_PATH),
-        ],
+        handlers=handlers,
     )
 
 
-def send_message(bot, message):
+def push_message(bot, message, chat_id=None):
     """
-    Отправляет сообщение в Telegram чат, определяемый переменной окружения...
-    TELEGRAM_CHAT_ID. Принимает на вход два параметра: экземпляр класса
-    Bot и строку с текстом сообщения. Возвращает True, если в ходе выполнения
-    не возникло исключений, и False, если исключение возникло
+    Отправляет сообщение в Telegram чат chat_id (по умолчанию...
+    TELEGRAM_CHAT_ID) в пределах адаптивного лимита SEND_LIMITER. Пишет
+    результат в лог и пробрасывает исключения вызывающему.
     """
+    chat_id = TELEGRAM_CHAT_ID if chat_id is None else chat_id
+    tracing.set_attributes({'telegram.chat_id': str(chat_id)})
     try:
-        bot.send_message(
-            chat_id=TELEGRAM_CHAT_ID,
-            text=message,
-        )
-        logging.info(OK_SEND_MESSAGE_TEMPLATE.format(
-            message=message,
-            chat_id=TELEGRAM_CHAT_ID
-        ))
-        return True
+        with SEND_LIMITER.slot(SLOT_TIMEOUT) as slot:
+            if slot is None:
+                raise BackpressureError(BACKPRESSURE_ERROR_TEMPLATE.format(
+                    name=SEND_LIMITER.name,
+                    timeout=SLOT_TIMEOUT,
+                    limits=SEND_LIMITER.snapshot()
+                ))
+            try:
+                bot.send_message(
+                    chat_id=chat_id,
+                    text=message,
+                )
+            except (NetworkError, RetryAfter):
+                slot.mark_overload()
+                raise
     except Exception as error:
         logging.exception(BAD_SEND_MESSAGE_TEMPLATE.format(
             message=message,
-            chat_id=TELEGRAM_CHAT_ID,
+            chat_id=chat_id,
             error=error
         ))
+        tracing.record_error(error)
+        raise
+    logging.info(OK_SEND_MESSAGE_TEMPLATE.format(
+        message=message,
+        chat_id=chat_id
+    ))
+
+
+@tracing.traced('send_message')
+def send_message(bot, message):
+    """
+    Отправляет сообщение в Telegram чат, определяемый переменной окружения...
+    TELEGRAM_CHAT_ID. Принимает на вход два параметра: экземпляр класса
+    Bot и строку с текстом сообщения. Возвращает True, если в ходе выполнения
+    не возникло исключений, и False, если исключение возникло. Отправка
+    выполняется в пределах адаптивного лимита SEND_LIMITER.
+    """
+    try:
+        push_message(bot, message)
+        return True
+    except Exception:
         return False
 
 
+def request_with_limit(request_details: dict):
+    """
+    Выполняет HTTP-запрос в пределах адаптивного лимита FETCH_LIMITER...
+    Сетевые ошибки и коды OVERLOAD_HTTP_CODES снижают лимит.
+    """
+    with FETCH_LIMITER.slot(SLOT_TIMEOUT) as slot:
+        if slot is None:
+            raise BackpressureError(BACKPRESSURE_ERROR_TEMPLATE.format(
+                name=FETCH_LIMITER.name,
+                timeout=SLOT_TIMEOUT,
+                limits=FETCH_LIMITER.snapshot()
+            ))
+        try:
+            response = requests.get(**request_details)
+        except requests.RequestException as error:
+            slot.mark_overload()
+            raise ConnectionError(CONNECTION_ERROR_TEMPLATE.format(
+                error=error,
+                **request_details
+            ))
+        if response.status_code in OVERLOAD_HTTP_CODES:
+            slot.mark_overload()
+        return response
+
+
+@tracing.traced('get_api_answer')
 def get_api_answer(current_timestamp: int):
     """
     Делает запрос к единственному эндпоинту API-сервиса. В качестве...
     параметра функция получает временную метку. В случае успешного
     запроса должна вернуть ответ API, преобразовав его из формата
-    JSON к типам данных Python.
+    JSON к типам данных Python. Запрос выполняется в рамках бюджета
+    RATE_LIMITER: запросы сверх бюджета откладываются, а не отбрасываются.
+    Число одновременных запросов ограничивает FETCH_LIMITER.
     """
     params = {'from_date': current_timestamp}
     request_details = {
@@ -129,13 +321,15 @@ def get_api_answer(current_timestamp: int):
         'headers': HEADERS,
         'params': params
     }
-    try:
-        response = requests.get(**request_details)
-    except requests.RequestException as error:
-        raise ConnectionError(CONNECTION_ERROR_TEMPLATE.format(
-            error=error,
-            **request_details
+    tracing.set_attributes({'practicum.from_date': current_timestamp})
+    wait = RATE_LIMITER.acquire()
+    if wait:
+        logging.info(RATE_LIMIT_DEFERRED_TEMPLATE.format(
+            url=ENDPOINT,
+            wait=wait,
+            stats=RATE_LIMITER.stats()
         ))
+    response = request_with_limit(request_details)
     if response.status_code != SUCCESS_RESPONSE_CODE:
         raise WrongHttpCodeError(WRONG_HTTP_RESPONSE_ERROR_TEMPLATE.format(
             **request_details,
@@ -152,6 +346,10 @@ def get_api_answer(current_timestamp: int):
                     error=response_json.get(error_key)
                 )
             )
+    if isinstance(response_json, dict):
+        tracing.set_attributes({
+            'practicum.current_date': response_json.get('current_date'),
+        })
     return response_json
 
 
@@ -164,7 +362,7 @@ def check_response(response: dict):
     if not response:
         raise ValueError(NO_GET_API_ANSWER_RESPONSE)
     if not isinstance(response, dict):
-        raise TypeError(WRONG_TYPE_MESSAGE_TEMPLATE.format(
+        raise TypeError(WRONG_TYPE_TEMPLATE.format(
             object=CHECK_RESPONSE_ARGUMENT_OBJECT,
             got=type(response),
             expected='dict'
@@ -173,7 +371,7 @@ def check_response(response: dict):
         raise KeyError(NO_HOMEWORKS_KEY_IN_RESPONSE)
     homeworks = response['homeworks']
     if not isinstance(homeworks, list):
-        raise TypeError(WRONG_TYPE_MESSAGE_TEMPLATE.format(
+        raise TypeError(WRONG_TYPE_TEMPLATE.format(
             object=HOMEWORKS_INFO_OBJECT,
             got=type(homeworks),
             expected='list'
@@ -181,15 +379,24 @@ def check_response(response: dict):
     return homeworks
 
 
+@tracing.traced('parse_status')
 def parse_status(homework):
     """Извлекает из информации о конкретной домашней работе статус этой работы...
     В качестве параметра функция получает только один элемент из списка
     домашних работ. В случае успеха, функция возвращает подготовленную для
     отправки в Telegram строку, содержащую один из вердиктов словаря
-    HOMEWORK_VERDICTS.
+    HOMEWORK_VERDICTS. Принимает как словарь из ответа API, так и готовую
+    запись HomeworkRecord.
     """
-    homework_status = homework['status']
-    homework_name = homework['homework_name']
+    if not isinstance(homework, HomeworkRecord):
+        homework = HomeworkRecord.from_dict(homework)
+    homework_status = homework.status
+    homework_name = homework.homework_name
+    tracing.set_attributes({
+        'homework.name': homework_name,
+        'homework.status': homework_status,
+        'homework.date_updated': homework.date_updated,
+    })
     if homework_status not in HOMEWORK_VERDICTS:
         raise ValueError(UNKNOWN_HOMEWORK_STATUS_TEMPLATE.format(
             homework_status=homework_status
@@ -212,6 +419,409 @@ def check_tokens():
     return True
 
 
+def fetch_homeworks(current_timestamp: int):
+    """
+    Запрашивает и проверяет список работ, объединяя одновременные...
+    запросы с тем же токеном и from_date в один. Все ожидающие получают
+    общий ответ API и общий кортеж HomeworkRecord.
+    """
+    def fetch():
+        with PROFILER.span('fetch'):
+            response = get_api_answer(current_timestamp)
+        with PROFILER.span('validate'):
+            return response, parse_homeworks(response)
+
+    return FETCHES.do((PRACTICUM_TOKEN, current_timestamp), fetch)
+
+
+def remember_homeworks(state, homeworks):
+    """
+    Кэширует в состоянии получателя проверенный ответ API: статусы...
+    работ и время проверки.
+    """
+    state.statuses.update(
+        (homework.homework_name, homework.status)
+        for homework in homeworks
+    )
+    state.checked_at = time.time()
+
+
+def render_cached_status(state):
+    """Формирует ответ на /status по кэшированным статусам работ..."""
+    checked_at = NEVER_CHECKED
+    if state.checked_at:
+        checked_at = time.strftime(
+            STATUS_TIME_FORMAT, time.localtime(state.checked_at)
+        )
+    statuses = dict(state.statuses)
+    if not statuses:
+        return NO_CACHED_STATUSES_TEMPLATE.format(checked_at=checked_at)
+    return CACHED_STATUS_TEMPLATE.format(
+        checked_at=checked_at,
+        statuses='\n'.join(
+            CACHED_STATUS_LINE_TEMPLATE.format(
+                homework_name=homework_name,
+                verdict=HOMEWORK_VERDICTS.get(status, status)
+            )
+            for homework_name, status in statuses.items()
+        )
+    )
+
+
+def answer_status(states, chat_id):
+    """
+    Отвечает на команду /status из кэша состояния. К API обращается...
+    только если кэш старше STATUS_MAX_AGE и сохраняет обновлённые
+    статусы; при ошибке запроса отвечает устаревшими данными.
+    """
+    state = states.get(PRACTICUM_TOKEN)
+    with tracing.span('status_command', {'telegram.chat_id': chat_id}):
+        if time.time() - state.checked_at > STATUS_MAX_AGE:
+            try:
+                remember_homeworks(
+                    state, fetch_homeworks(state.current_timestamp)[1]
+                )
+            except Exception as error:
+                logging.warning(STATUS_REFRESH_ERROR_TEMPLATE.format(
+                    error=error
+                ))
+            else:
+                states.save(state)
+        return render_cached_status(state)
+
+
+def reply_to_command(bot, chat_id, text):
+    """Отвечает на команду бота в пределах лимита SEND_LIMITER..."""
+    push_message(bot, text, chat_id)
+
+
+def start_command_poller(bot, states, lease):
+    """
+    Запускает фоновый поток обработки команд бота. В режиме...
+    active/standby команды обрабатывает только лидер.
+    """
+    poller = CommandPoller(
+        bot,
+        {'/status': partial(answer_status, states)},
+        join(states.directory, STATUS_OFFSET_FILE),
+        [TELEGRAM_CHAT_ID],
+        STATUS_COMMAND_RATE,
+        STATUS_COMMAND_BURST,
+        STATUS_POLL_TIMEOUT,
+        send=partial(reply_to_command, bot),
+    )
+    thread = threading.Thread(
+        target=poller.run,
+        args=(lambda: lease is None or lease.is_leader, LEADER_CHECK_TIME),
+        daemon=True,
+    )
+    thread.start()
+    return poller
+
+
+def record_transitions(event_log, statuses, homeworks):
+    """
+    Записывает в журнал переходы статусов полученных работ относительно...
+    известных статусов statuses (TenantState.statuses до их обновления).
+    Ошибки записи журнала логируются и не прерывают итерацию.
+    """
+    try:
+        for homework in homeworks:
+            event = event_log.record(
+                homework.homework_name,
+                homework.status,
+                COHORT,
+                homework.date_updated,
+                statuses.get(homework.homework_name)
+            )
+            if event is not None:
+                logging.info(TRANSITION_TEMPLATE.format(
+                    homework_name=event.homework_name,
+                    from_status=event.from_status or None,
+                    to_status=event.to_status
+                ))
+    except OSError as error:
+        logging.exception(EVENT_LOG_ERROR_TEMPLATE.format(
+            path=event_log.path,
+            error=error
+        ))
+
+
+def deliver(bot, message, record):
+    """
+    Отправляет сообщение из очереди доставки, продолжая трассу...
+    итерации опроса, в которой сообщение было поставлено в очередь.
+    Если Telegram просит подождать (RetryAfter) или не освободился слот
+    SEND_LIMITER (BackpressureError - локальная перегрузка, а не сбой
+    доставки), вызывает DeliveryDeferredError: такая попытка не
+    приближает сообщение к переносу в dead.
+    """
+    parent = None
+    if record.get('trace'):
+        parent = tracing.SpanContext(*record['trace'])
+    with tracing.span('deliver', {
+        'delivery.key': record['key'],
+        'delivery.attempt': record['attempts'] + 1,
+    }, parent=parent):
+        try:
+            push_message(bot, message)
+        except RetryAfter as error:
+            raise DeliveryDeferredError(error.retry_after) from error
+        except BackpressureError as error:
+            raise DeliveryDeferredError(DELIVERY_RETRY_TIME) from error
+        except Exception:
+            return False
+        return True
+
+
+def start_delivery_worker(bot, outbox, lease):
+    """
+    Запускает фоновый поток доставки сообщений из очереди. В режиме...
+    active/standby очередь разбирает только лидер.
+    """
+    worker = DeliveryWorker(
+        outbox,
+        partial(deliver, bot),
+        DELIVERY_RETRY_TIME,
+        DELIVERY_MAX_RETRY_TIME,
+    )
+    threading.Thread(
+        target=worker.run,
+        args=(lambda: lease is None or lease.is_leader,),
+        daemon=True,
+    ).start()
+    return worker
+
+
+def verdict_key(homework):
+    """Ключ идемпотентности вердикта по работе..."""
+    return idempotency_key(
+        TELEGRAM_CHAT_ID,
+        homework.homework_name,
+        homework.status,
+        homework.date_updated
+    )
+
+
+def ingest_homeworks(outbox, states, event_log, worker, payload):
+    """
+    Обрабатывает работы, присланные в HTTP-приёмник: проверяет их тем...
+    же валидатором, что и ответ API, и сразу ставит вердикты по всем
+    работам в очередь доставки. Некорректные данные отклоняются целиком.
+    В отличие от ответа API, date_updated обязателен: он входит в ключ
+    идемпотентности, и без него повторная проверка с тем же статусом
+    была бы принята за уже доставленный вердикт. Возвращает число
+    принятых работ.
+    """
+    with tracing.span('ingest'):
+        homeworks = parse_homeworks({'homeworks': payload})
+        for index, homework in enumerate(homeworks):
+            if not homework.date_updated:
+                raise HomeworkFormatError(
+                    MISSING_HOMEWORK_KEY_TEMPLATE.format(
+                        key='date_updated',
+                        index=index,
+                        homework=homework.to_dict()
+                    )
+                )
+        messages = [parse_status(homework) for homework in homeworks]
+        state = states.get(PRACTICUM_TOKEN)
+        if event_log is not None:
+            record_transitions(event_log, state.statuses, homeworks)
+        remember_homeworks(state, homeworks)
+        for homework, message in zip(homeworks, messages):
+            outbox.enqueue(
+                message, verdict_key(homework), tracing.current_context()
+            )
+        states.save(state)
+    worker.wake()
+    return len(homeworks)
+
+
+def make_ingest_server(outbox, states, event_log, worker, lease):
+    """
+    Создаёт HTTP-приёмник статусов, если задан INGEST_PORT. Принимает...
+    данные только лидер.
+    """
+    if not INGEST_PORT:
+        return None
+    return IngestServer(
+        INGEST_HOST,
+        int(INGEST_PORT),
+        partial(ingest_homeworks, outbox, states, event_log, worker),
+        lambda: lease is None or lease.is_leader,
+        INGEST_TOKEN,
+    )
+
+
+def start_ingest(ingest):
+    """
+    Запускает HTTP-приёмник, если он задан, и возвращает период опроса...
+    API: INGEST_RECONCILE_TIME, пока приёмник работает, и RETRY_TIME без
+    него. Если порт ещё занят прежним лидером (OSError), ошибка пишется в
+    лог, а запуск повторяется на следующей итерации.
+    """
+    if ingest is None:
+        return RETRY_TIME
+    try:
+        ingest.start()
+    except OSError as error:
+        logging.warning(INGEST_START_ERROR_TEMPLATE.format(
+            error=error,
+            retry_time=RETRY_TIME
+        ))
+        return RETRY_TIME
+    return INGEST_RECONCILE_TIME
+
+
+def holds_lease(lease):
+    """
+    Продлевает аренду лидера перед действиями с побочными эффектами...
+    Возвращает True без аренды (режим одного экземпляра) или если аренда
+    всё ещё принадлежит этому экземпляру.
+    """
+    if lease is None or lease.try_acquire():
+        return True
+    logging.warning(LEASE_LOST_TEMPLATE.format(
+        path=lease.path,
+        owner=lease.owner
+    ))
+    return False
+
+
+def poll_once(outbox, state, event_log=None, lease=None):
+    """
+    Одна итерация опроса: запрашивает API, ставит вердикт по последней...
+    работе в очередь доставки outbox и обновляет TenantState:
+    current_timestamp, last_error и известные статусы работ. Отметка
+    времени сдвигается сразу после сохранения сообщения в очереди, а не
+    после отправки, поэтому сбои Telegram не вызывают повторных запросов
+    к API. Если передан event_log, переходы записываются в журнал. Если
+    передана аренда lease и за время запроса она потеряна, итерация
+    завершается без изменений: ответ обработает новый лидер.
+    """
+    try:
+        response, homeworks = fetch_homeworks(state.current_timestamp)
+        if not holds_lease(lease):
+            return
+        if event_log is not None:
+            record_transitions(event_log, state.statuses, homeworks)
+        remember_homeworks(state, homeworks)
+        if not homeworks:
+            return
+        with PROFILER.span('render'):
+            message = parse_status(homeworks[0])
+        with PROFILER.span('enqueue'):
+            outbox.enqueue(
+                message, verdict_key(homeworks[0]), tracing.current_context()
+            )
+        state.current_timestamp = response.get(
+            'current_date', state.current_timestamp
+        )
+    except Exception as error:
+        error_message = LAST_FRONTIER_ERROR_TEMPLATE.format(
+            error=error
+        )
+        logging.exception(error_message)
+        if state.last_error == error_message or not holds_lease(lease):
+            return
+        try:
+            outbox.enqueue(error_message, idempotency_key(
+                TELEGRAM_CHAT_ID, error_message, time.time_ns()
+            ), tracing.current_context())
+            state.last_error = error_message
+        except OSError:
+            logging.exception(SEND_ERROR_INFO_EXCEPTION)
+
+
+def wait_for_next_poll(lease, seconds: float):
+    """
+    Ждёт следующей итерации, продлевая аренду лидера не реже, чем раз...
+    в треть её срока. Возвращает False, если аренда была потеряна.
+    """
+    if lease is None:
+        time.sleep(seconds)
+        return True
+    deadline = time.monotonic() + seconds
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return True
+        time.sleep(min(remaining, lease.ttl / 3))
+        if not holds_lease(lease):
+            return False
+
+
+def wait_for_leadership(bot, lease, states):
+    """
+    Захватывает аренду лидера. Если она занята, переходит в режим...
+    standby: держит бота инициализированным и раз в LEADER_CHECK_TIME
+    секунд пытается захватить аренду. После захвата сбрасывает кэш
+    состояния, чтобы продолжить с места, сохранённого прежним лидером.
+    """
+    if not lease.try_acquire():
+        logging.info(STANDBY_BOT_MESSAGE.format(path=lease.path))
+        try:
+            bot.get_me()
+        except Exception as error:
+            logging.warning(STANDBY_WARMUP_ERROR_TEMPLATE.format(
+                error=error
+            ))
+        while not lease.try_acquire():
+            time.sleep(LEADER_CHECK_TIME)
+    logging.info(LEASE_ACQUIRED_TEMPLATE.format(
+        path=lease.path,
+        owner=lease.owner
+    ))
+    states.invalidate(PRACTICUM_TOKEN)
+
+
+def poll_is_deferred(outbox):
+    """
+    Противодавление: откладывает опрос API, пока очередь доставки...
+    длиннее DELIVERY_HIGH_WATERMARK.
+    """
+    pending = outbox.stats()['pending']
+    if pending <= DELIVERY_HIGH_WATERMARK:
+        return False
+    logging.warning(DEFERRED_POLL_TEMPLATE.format(
+        pending=pending,
+        limit=DELIVERY_HIGH_WATERMARK
+    ))
+    return True
+
+
+def observe_loop_lag(scheduled: float = None):
+    """
+    Снижает лимиты, если итерация цикла опроса началась позже...
+    запланированного времени scheduled (по time.monotonic(): начало
+    предыдущей итерации плюс период опроса) больше чем на
+    LOOP_LAG_THRESHOLD секунд. Опоздание включает и время самой итерации,
+    и задержку пробуждения. Первую итерацию (scheduled is None) не
+    оценивает.
+    """
+    if scheduled is None:
+        return
+    lag = time.monotonic() - scheduled
+    if lag > LOOP_LAG_THRESHOLD:
+        for limiter in (FETCH_LIMITER, SEND_LIMITER):
+            limiter.overload(LOOP_LAG_TEMPLATE.format(lag=lag))
+
+
+def log_runtime_stats(states, outbox, worker):
+    """Пишет в лог размеры кэшей, очередей, тайминги и текущие лимиты..."""
+    logging.debug(RUNTIME_STATS_TEMPLATE.format(stats={
+        'state_cache': states.stats(),
+        'delivery': dict(outbox.stats(), **worker.stats()),
+        'fetch_coalescing': FETCHES.stats(),
+        'rate_limit': RATE_LIMITER.stats(),
+        'concurrency': {
+            FETCH_LIMITER.name: FETCH_LIMITER.snapshot(),
+            SEND_LIMITER.name: SEND_LIMITER.snapshot(),
+        },
+    }))
+
+
 def main():
     """Основная логика работы бота..."""
     logging.info(START_BOT_MESSAGE)
@@ -219,26 +829,39 @@ def main():
         logging.critical(STOP_BOT_MESSAGE)
         raise EnvironmentError(STOP_BOT_MESSAGE)
     bot = Bot(token=TELEGRAM_TOKEN)
-    last_error = None
-    current_timestamp = 0
+    lease = None
+    if LEADER_LEASE_PATH:
+        lease = LeaderLease(LEADER_LEASE_PATH, LEADER_LEASE_TTL)
+    states = TenantStateCache(STATE_DIR, STATE_CACHE_SIZE)
+    event_log = EventLog(EVENT_LOG_PATH)
+    outbox = DeliveryQueue(
+        DELIVERY_DIR, max_attempts=DELIVERY_MAX_ATTEMPTS
+    )
+    worker = start_delivery_worker(bot, outbox, lease)
+    if STATUS_COMMAND_ENABLED:
+        start_command_poller(bot, states, lease)
+    ingest = make_ingest_server(outbox, states, event_log, worker, lease)
+    PROFILER.arm(PROFILE_ITERATIONS)
+    PROFILER.install_signal()
+    tracing.configure(TRACE_EXPORT_PATH)
+    scheduled = None
     while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            homeworks = check_response(response)
-            if homeworks and send_message(bot, parse_status(homeworks[0])):
-                current_timestamp = response.get(
-                    'current_date', current_timestamp
-                )
-        except Exception as error:
-            error_message = LAST_FRONTIER_ERROR_TEMPLATE.format(
-                error=error
-            )
-            logging.exception(error_message)
-            if last_error != error_message and send_message(
-                bot, error_message
-            ):
-                last_error = error_message
-        time.sleep(RETRY_TIME)
+        if lease is not None and not lease.is_leader:
+            wait_for_leadership(bot, lease, states)
+            scheduled = None
+        observe_loop_lag(scheduled)
+        retry_time = start_ingest(ingest)
+        scheduled = time.monotonic() + retry_time
+        if not poll_is_deferred(outbox):
+            state = states.get(PRACTICUM_TOKEN)
+            with PROFILER.iteration(), tracing.span('poll'):
+                poll_once(outbox, state, event_log, lease)
+            if holds_lease(lease):
+                states.save(state)
+        worker.wake()
+        log_runtime_stats(states, outbox, worker)
+        if not wait_for_next_poll(lease, retry_time) and ingest is not None:
+            ingest.stop()
 
 
 if __name__ == '__main__':
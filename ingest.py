@@ -0,0 +1,138 @@
+import json
+import logging
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+INGEST_PATH = '/homeworks'
+TOKEN_HEADER = 'X-Ingest-Token'
+BAD_CONTENT_LENGTH_TEMPLATE = 'Bad Content-Length: {length}'
+INGEST_ACCEPTED_TEMPLATE = 'Accepted {count} pushed homeworks from {client}'
+INGEST_FAILED_TEMPLATE = 'Cannot process push from {client}'
+INGEST_REJECTED_TEMPLATE = 'Rejected push from {client}: {error}'
+INGEST_STARTED_TEMPLATE = 'Ingest endpoint listening on http://{host}:{port}'
+INGEST_STOPPED_MESSAGE = 'Ingest endpoint stopped'
+
+
+def extract_homeworks(payload):
+    """
+    Принимает тело запроса: список работ в формате ключа homeworks...
+    ответа API или объект с этим ключом. Возвращает список работ.
+    """
+    if isinstance(payload, dict) and 'homeworks' in payload:
+        return payload['homeworks']
+    return payload
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    """Обработчик POST /homeworks локального приёмника статусов..."""
+
+    def _reply(self, status, body):
+        content = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _read_payload(self):
+        length = self.headers.get('Content-Length') or '0'
+        if not length.isdigit():
+            raise ValueError(BAD_CONTENT_LENGTH_TEMPLATE.format(length=length))
+        length = int(length)
+        if length > self.server.max_body:
+            raise ValueError(f'Body is larger than {self.server.max_body}')
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def do_POST(self):
+        """Передаёт работы из тела запроса в обработчик бота..."""
+        server = self.server
+        if self.path != INGEST_PATH:
+            return self._reply(HTTPStatus.NOT_FOUND, {'error': 'not found'})
+        if server.token and self.headers.get(TOKEN_HEADER) != server.token:
+            return self._reply(HTTPStatus.FORBIDDEN, {'error': 'bad token'})
+        if not server.is_active():
+            return self._reply(
+                HTTPStatus.SERVICE_UNAVAILABLE, {'error': 'standby'}
+            )
+        try:
+            homeworks = extract_homeworks(self._read_payload())
+            accepted = server.callback(homeworks)
+        except (ValueError, TypeError, KeyError) as error:
+            logging.warning(INGEST_REJECTED_TEMPLATE.format(
+                client=self.client_address[0],
+                error=error
+            ))
+            return self._reply(HTTPStatus.BAD_REQUEST, {'error': str(error)})
+        except Exception:
+            logging.exception(INGEST_FAILED_TEMPLATE.format(
+                client=self.client_address[0]
+            ))
+            return self._reply(
+                HTTPStatus.INTERNAL_SERVER_ERROR, {'error': 'internal error'}
+            )
+        logging.info(INGEST_ACCEPTED_TEMPLATE.format(
+            count=accepted,
+            client=self.client_address[0]
+        ))
+        return self._reply(HTTPStatus.ACCEPTED, {'accepted': accepted})
+
+    def log_message(self, format, *args):
+        """Пишет журнал запросов в общий лог вместо stderr..."""
+        logging.debug(format, *args)
+
+
+class IngestServer:
+    """
+    Локальный HTTP-приёмник статусов домашних работ...
+    Каждый POST /homeworks сразу передаётся в callback(homeworks), который
+    возвращает число принятых работ или поднимает ValueError, TypeError
+    или KeyError для некорректных данных (ответ 400). Остальные ошибки
+    callback (например, OSError при записи очереди) пишутся в лог, а
+    клиент получает 500 и может повторить запрос. Пока is_active()
+    возвращает False, приёмник отвечает 503.
+    """
+
+    def __init__(self, host: str, port: int, callback, is_active,
+                 token: str = None, max_body: int = 1 << 20):
+        """Создаёт приёмник на host:port без запуска..."""
+        self.host = host
+        self.port = port
+        self.callback = callback
+        self.is_active = is_active
+        self.token = token
+        self.max_body = max_body
+        self._server = None
+
+    @property
+    def running(self):
+        """Запущен ли приёмник..."""
+        return self._server is not None
+
+    def start(self):
+        """Запускает приёмник в фоновом потоке..."""
+        if self.running:
+            return
+        server = ThreadingHTTPServer((self.host, self.port), IngestHandler)
+        server.daemon_threads = True
+        server.callback = self.callback
+        server.is_active = self.is_active
+        server.token = self.token
+        server.max_body = self.max_body
+        self.port = server.server_address[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._server = server
+        logging.info(INGEST_STARTED_TEMPLATE.format(
+            host=self.host,
+            port=self.port
+        ))
+
+    def stop(self):
+        """Останавливает приёмник и освобождает порт..."""
+        if not self.running:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        logging.info(INGEST_STOPPED_MESSAGE)
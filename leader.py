@@ -0,0 +1,82 @@
+import fcntl
+import json
+import os
+import socket
+import time
+import uuid
+
+
+LEASE_ACQUIRED_TEMPLATE = 'Lease {path} acquired by {owner}. Acting as leader'
+LEASE_LOST_TEMPLATE = 'Lease {path} lost by {owner}. Switching to standby'
+
+
+class LeaderLease:
+    """
+    Аренда лидерства через локальный файл...
+    Файл хранит владельца и время окончания аренды. Лидер продлевает
+    аренду чаще, чем раз в ttl секунд; резервный экземпляр забирает её,
+    как только она истекла. Чтение и запись выполняются под flock, поэтому
+    два экземпляра не могут стать лидерами одновременно. Экземпляр
+    считает себя лидером только до окончания своей аренды: если он не
+    успел её продлить, is_leader становится False ещё до того, как
+    аренду заберёт резервный экземпляр.
+    """
+
+    def __init__(self, path: str, ttl: float, owner: str = None,
+                 clock=time.time):
+        """Создаёт аренду в файле path со сроком ttl секунд..."""
+        self.path = path
+        self.ttl = ttl
+        self.owner = owner or '{host}:{pid}:{suffix}'.format(
+            host=socket.gethostname(),
+            pid=os.getpid(),
+            suffix=uuid.uuid4().hex[:8]
+        )
+        self.clock = clock
+        self.expires = None
+
+    @property
+    def is_leader(self):
+        """Является ли экземпляр лидером в текущий момент..."""
+        return self.expires is not None and self.clock() < self.expires
+
+    def _update(self, take: bool):
+        with open(self.path, 'a+') as lease_file:
+            fcntl.flock(lease_file, fcntl.LOCK_EX)
+            try:
+                lease_file.seek(0)
+                try:
+                    lease = json.loads(lease_file.read() or '{}')
+                except ValueError:
+                    lease = {}
+                now = self.clock()
+                ours = lease.get('owner') == self.owner
+                if not ours and lease.get('expires', 0) > now:
+                    return None
+                expires = now + self.ttl if take else None
+                lease_file.seek(0)
+                lease_file.truncate()
+                if take:
+                    json.dump(
+                        {'owner': self.owner, 'expires': expires},
+                        lease_file
+                    )
+                lease_file.flush()
+                os.fsync(lease_file.fileno())
+                return expires
+            finally:
+                fcntl.flock(lease_file, fcntl.LOCK_UN)
+
+    def try_acquire(self):
+        """
+        Захватывает или продлевает аренду. Возвращает True, если этот...
+        экземпляр является лидером после вызова.
+        """
+        self.expires = self._update(take=True)
+        return self.is_leader
+
+    def release(self):
+        """Освобождает аренду, если она принадлежит этому экземпляру..."""
+        if self.is_leader:
+            self._update(take=False)
+        self.expires = None
@@ -0,0 +1,130 @@
+import cProfile
+import logging
+import signal
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+NULL_SPAN = nullcontext()
+PROFILE_ARMED_TEMPLATE = 'Profiling armed for the next {iterations} iterations'
+PROFILE_DUMPED_TEMPLATE = 'Profile for {iterations} iterations saved to {path}'
+PROFILE_DUMP_ERROR_TEMPLATE = (
+    'Cannot save profile for {iterations} iterations: {error}'
+)
+SPANS_TEMPLATE = 'Iteration timings: {spans} total={total:.4f}s'
+
+
+class LoopProfiler:
+    """
+    Профилировщик цикла опроса, включаемый на N итераций...
+    Пока профилировщик не взведён, span() возвращает общий пустой
+    контекстный менеджер, а iteration() только сверяет счётчик, поэтому
+    накладные расходы в обычном режиме близки к нулю. Во взведённом
+    состоянии каждая итерация выполняется под cProfile, длительности
+    участков пишутся в лог, а после N итераций статистика сохраняется
+    в файл по шаблону path_template. Ошибка сохранения только пишется в
+    лог и не прерывает цикл опроса.
+    """
+
+    def __init__(self, path_template: str, signal_iterations: int):
+        """Создаёт выключенный профилировщик..."""
+        self.path_template = path_template
+        self.signal_iterations = signal_iterations
+        self.active = False
+        self._pending = 0
+        self._remaining = 0
+        self._total = 0
+        self._profile = None
+        self._spans = {}
+        self._thread = None
+
+    def arm(self, iterations: int):
+        """Включает профилирование для следующих iterations итераций..."""
+        if iterations > 0:
+            self._pending = iterations
+
+    def install_signal(self, signum=getattr(signal, 'SIGUSR1', None)):
+        """Взводит профилировщик по сигналу (по умолчанию SIGUSR1)..."""
+        if signum is None:
+            return
+        signal.signal(
+            signum,
+            lambda *args: self.arm(self.signal_iterations)
+        )
+
+    @contextmanager
+    def _span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._spans[name] = (
+                self._spans.get(name, 0) + time.perf_counter() - start
+            )
+
+    def span(self, name: str):
+        """
+        Замеряет длительность участка итерации с именем name. Участки...
+        из других потоков (например, команды /status) не учитываются,
+        чтобы не смешивать их с таймингами итерации.
+        """
+        if not self.active or threading.get_ident() != self._thread:
+            return NULL_SPAN
+        return self._span(name)
+
+    def iteration(self):
+        """Оборачивает одну итерацию цикла опроса..."""
+        if self._pending:
+            self._start(self._pending)
+        if not self.active:
+            return NULL_SPAN
+        return self._iteration()
+
+    def _start(self, iterations):
+        logging.info(PROFILE_ARMED_TEMPLATE.format(iterations=iterations))
+        self._pending = 0
+        self._remaining = self._total = iterations
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+        self.active = True
+
+    @contextmanager
+    def _iteration(self):
+        self._spans = {}
+        self._thread = threading.get_ident()
+        start = time.perf_counter()
+        self._profile.enable()
+        try:
+            yield
+        finally:
+            self._profile.disable()
+            self._thread = None
+            logging.info(SPANS_TEMPLATE.format(
+                spans=' '.join(
+                    f'{name}={seconds:.4f}s'
+                    for name, seconds in self._spans.items()
+                ),
+                total=time.perf_counter() - start
+            ))
+            self._remaining -= 1
+            if self._remaining <= 0:
+                self._dump()
+
+    def _dump(self):
+        try:
+            path = self.path_template.format(timestamp=int(time.time()))
+            self._profile.dump_stats(path)
+        except (OSError, KeyError, IndexError, ValueError) as error:
+            logging.error(PROFILE_DUMP_ERROR_TEMPLATE.format(
+                iterations=self._total,
+                error=error
+            ))
+        else:
+            logging.info(PROFILE_DUMPED_TEMPLATE.format(
+                iterations=self._total,
+                path=path
+            ))
+        finally:
+            self._profile = None
+            self.active = False
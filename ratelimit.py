@@ -0,0 +1,152 @@
+import fcntl
+import json
+import logging
+import threading
+import time
+
+
+STATE_LOAD_ERROR_TEMPLATE = (
+    'Cannot read rate limiter state from {path}. Error: {error}. '
+    'Starting with a full bucket'
+)
+
+
+class TokenBucket:
+    """
+    Потокобезопасное ведро токенов для ограничения частоты запросов...
+    Запрос сверх бюджета не отбрасывается: acquire резервирует будущий
+    токен и ждёт его появления, возвращая время ожидания. Суммарные и
+    максимальные задержки доступны через stats().
+    """
+
+    def __init__(self, rate: float, burst: int,
+                 clock=time.monotonic, sleep=time.sleep):
+        """Создаёт ведро на rate запросов в секунду и burst токенов..."""
+        if rate <= 0 or burst < 1:
+            raise ValueError(
+                f'Bad rate limit: rate={rate}, burst={burst}'
+            )
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = clock()
+        self.requests = 0
+        self.deferred = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def _load(self, state_file=None):
+        return self._tokens, self._updated
+
+    def _store(self, tokens, updated, state_file=None):
+        self._tokens, self._updated = tokens, updated
+
+    def _take(self, reserve: bool, state_file=None):
+        """
+        Пополняет ведро за прошедшее время и забирает токен...
+        Возвращает время ожидания токена в секундах или None, если токена
+        нет, а резервировать его не разрешено. state_file - открытый файл
+        состояния для ведра, общего для процессов.
+        """
+        now = self.clock()
+        tokens, updated = self._load(state_file)
+        tokens = min(self.burst, tokens + max(now - updated, 0) * self.rate)
+        if tokens < 1 and not reserve:
+            self._store(tokens, now, state_file)
+            return None
+        tokens -= 1
+        self._store(tokens, now, state_file)
+        return max(-tokens, 0) / self.rate
+
+    def _reserve(self, reserve: bool):
+        with self._lock:
+            return self._take(reserve)
+
+    def acquire(self):
+        """Ждёт разрешения на запрос и возвращает время ожидания..."""
+        wait = self._reserve(reserve=True)
+        with self._lock:
+            self.requests += 1
+            self.last_wait = wait
+            if wait:
+                self.deferred += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+        if wait:
+            self.sleep(wait)
+        return wait
+
+    def try_acquire(self):
+        """Забирает токен без ожидания. Возвращает False, если их нет..."""
+        return self._reserve(reserve=False) is not None
+
+    def stats(self):
+        """Возвращает счётчики запросов и отложенных ожиданий..."""
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'requests': self.requests,
+                'deferred': self.deferred,
+                'total_wait': round(self.total_wait, 3),
+                'max_wait': round(self.max_wait, 3),
+                'last_wait': round(self.last_wait, 3),
+            }
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Ведро токенов, общее для нескольких процессов на одной машине...
+    Состояние ведра хранится в файле state_path, а каждое изъятие токена
+    выполняется под эксклюзивной блокировкой flock, поэтому все воркеры с
+    одним state_path делят один бюджет запросов.
+    """
+
+    def __init__(self, state_path: str, rate: float, burst: int,
+                 clock=time.time, sleep=time.sleep):
+        """Создаёт ведро с состоянием в файле state_path..."""
+        super().__init__(rate, burst, clock=clock, sleep=sleep)
+        self.state_path = state_path
+
+    def _load(self, state_file=None):
+        state_file.seek(0)
+        content = state_file.read()
+        if not content:
+            return float(self.burst), self.clock()
+        try:
+            state = json.loads(content)
+            return float(state['tokens']), float(state['updated'])
+        except (ValueError, KeyError, TypeError) as error:
+            logging.warning(STATE_LOAD_ERROR_TEMPLATE.format(
+                path=self.state_path,
+                error=error
+            ))
+            return float(self.burst), self.clock()
+
+    def _store(self, tokens, updated, state_file=None):
+        state_file.seek(0)
+        state_file.truncate()
+        json.dump({'tokens': tokens, 'updated': updated}, state_file)
+        state_file.flush()
+
+    def _reserve(self, reserve: bool):
+        with self._lock, open(self.state_path, 'a+') as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                return self._take(reserve, state_file)
+            finally:
+                fcntl.flock(state_file, fcntl.LOCK_UN)
+
+
+def make_bucket(rate: float, burst: int, state_path: str = None):
+    """
+    Создаёт ведро токенов: общее для процессов, если задан файл...
+    состояния, и локальное для потоков процесса в противном случае.
+    """
+    if state_path:
+        return FileTokenBucket(state_path, rate, burst)
+    return TokenBucket(rate, burst)
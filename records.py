@@ -0,0 +1,135 @@
+from sys import intern
+
+from exceptions import HomeworkFormatError
+
+
+SLOTS = ('homework_name', 'status', 'id', 'date_updated', 'lesson_name')
+# Шаблоны сообщений
+MISSING_HOMEWORK_KEY_TEMPLATE = (
+    'Key "{key}" not found in homework #{index}: {homework}'
+)
+NO_HOMEWORKS_KEY_MESSAGE = 'Key "homeworks" not found in API response'
+NO_RESPONSE_MESSAGE = 'Null or empty API response.'
+WRONG_TYPE_TEMPLATE = (
+    'Wrong datatype for {object} '
+    'Got: {got}. Expected: {expected}.'
+)
+
+
+class HomeworkRecord:
+    """
+    Компактное представление одной домашней работы из ответа API...
+    Хранит только поля, которые нужны боту, а строки статуса и названия
+    урока интернирует, чтобы тысячи записей ссылались на одни и те же
+    объекты str.
+    """
+
+    __slots__ = SLOTS
+
+    def __init__(self, homework_name, status, id=None,
+                 date_updated=None, lesson_name=None):
+        """Создаёт запись, интернируя строки статуса и названия урока..."""
+        self.homework_name = homework_name
+        self.status = intern(status)
+        self.id = id
+        self.date_updated = date_updated
+        self.lesson_name = (
+            intern(lesson_name) if isinstance(lesson_name, str)
+            else lesson_name
+        )
+
+    @classmethod
+    def from_dict(cls, homework: dict, index: int = 0):
+        """Строит запись из словаря API, проверяя обязательные ключи..."""
+        if not isinstance(homework, dict):
+            raise TypeError(WRONG_TYPE_TEMPLATE.format(
+                object=f'homework #{index}',
+                got=type(homework),
+                expected='dict'
+            ))
+        try:
+            homework_name = homework['homework_name']
+            status = homework['status']
+        except KeyError as error:
+            raise HomeworkFormatError(MISSING_HOMEWORK_KEY_TEMPLATE.format(
+                key=error.args[0],
+                index=index,
+                homework=homework
+            ))
+        if not isinstance(homework_name, str):
+            raise TypeError(WRONG_TYPE_TEMPLATE.format(
+                object=f'"homework_name" of homework #{index}',
+                got=type(homework_name),
+                expected='str'
+            ))
+        if not isinstance(status, str):
+            raise TypeError(WRONG_TYPE_TEMPLATE.format(
+                object=f'"status" of homework #{index}',
+                got=type(status),
+                expected='str'
+            ))
+        return cls(
+            homework_name,
+            status,
+            homework.get('id'),
+            homework.get('date_updated'),
+            homework.get('lesson_name'),
+        )
+
+    def to_dict(self):
+        """Возвращает запись в формате словаря API..."""
+        return {
+            key: getattr(self, key)
+            for key in self.__slots__
+            if getattr(self, key) is not None
+        }
+
+    def __eq__(self, other):
+        """Записи равны, если совпадают все поля..."""
+        if not isinstance(other, HomeworkRecord):
+            return NotImplemented
+        return all(
+            getattr(self, key) == getattr(other, key)
+            for key in self.__slots__
+        )
+
+    def __hash__(self):
+        """Хэш по всем полям, согласованный с __eq__..."""
+        return hash(tuple(getattr(self, key) for key in self.__slots__))
+
+    def __repr__(self):
+        """Краткое представление записи для логов..."""
+        return (
+            f'HomeworkRecord(homework_name={self.homework_name!r}, '
+            f'status={self.status!r})'
+        )
+
+
+def parse_homeworks(response):
+    """
+    Проверяет ответ API и за один проход превращает список работ...
+    в кортеж HomeworkRecord. Ошибки формата поднимаются с теми же типами,
+    что и в check_response, а отсутствующий ключ работы поднимает
+    HomeworkFormatError с указанием ключа и номера работы.
+    """
+    if not response:
+        raise ValueError(NO_RESPONSE_MESSAGE)
+    if not isinstance(response, dict):
+        raise TypeError(WRONG_TYPE_TEMPLATE.format(
+            object='API response',
+            got=type(response),
+            expected='dict'
+        ))
+    if 'homeworks' not in response:
+        raise HomeworkFormatError(NO_HOMEWORKS_KEY_MESSAGE)
+    homeworks = response['homeworks']
+    if not isinstance(homeworks, list):
+        raise TypeError(WRONG_TYPE_TEMPLATE.format(
+            object='homeworks info',
+            got=type(homeworks),
+            expected='list'
+        ))
+    return tuple(
+        HomeworkRecord.from_dict(homework, index)
+        for index, homework in enumerate(homeworks)
+    )
@@ -0,0 +1,68 @@
+import threading
+
+
+class _Call:
+    """Выполняющийся запрос и его результат..."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        """Создаёт незавершённый запрос..."""
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Объединяет одновременные одинаковые запросы в один...
+    Пока запрос с ключом key выполняется, остальные вызовы do() с тем же
+    ключом ждут его и получают тот же результат или то же исключение.
+    Результат не кэшируется: следующий вызов после завершения запроса
+    выполнит новый. stats() возвращает долю объединённых вызовов.
+    """
+
+    def __init__(self):
+        """Создаёт пустую группу запросов..."""
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.requests = 0
+        self.executions = 0
+
+    def do(self, key, func):
+        """Выполняет func() или присоединяется к уже идущему вызову..."""
+        with self._lock:
+            self.requests += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """Возвращает число вызовов, запросов и долю объединённых..."""
+        with self._lock:
+            shared = self.requests - self.executions
+            return {
+                'requests': self.requests,
+                'executions': self.executions,
+                'deduplicated': shared,
+                'dedup_ratio': (
+                    round(shared / self.requests, 4) if self.requests else 0.0
+                ),
+            }
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+
+STATE_LOAD_ERROR_TEMPLATE = (
+    'Cannot load bot state from {path}. Error: {error}. Using defaults'
+)
+
+
+def load_state(path: str, default: dict):
+    """
+    Загружает сохранённое состояние бота из json-файла...
+    Отсутствующие ключи дополняются значениями из default.
+    """
+    state = dict(default)
+    try:
+        with open(path, encoding='utf-8') as state_file:
+            state.update(json.load(state_file))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as error:
+        logging.warning(STATE_LOAD_ERROR_TEMPLATE.format(
+            path=path,
+            error=error
+        ))
+    return state
+
+
+def save_state(path: str, state: dict):
+    """
+    Атомарно сохраняет состояние бота: пишет во временный файл и...
+    подменяет им основной, чтобы читатель не увидел файл наполовину.
+    """
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as state_file:
+        json.dump(state, state_file, ensure_ascii=False)
+        state_file.flush()
+        os.fsync(state_file.fileno())
+    os.replace(temp_path, path)
+
+
+class TenantState:
+    """
+    Состояние опроса одного получателя (токена Практикума)...
+    Хранит отметку времени для from_date, текст последней отправленной
+    ошибки и последние известные статусы домашних работ. Время последней
+    проверки API (checked_at) живёт только в памяти и на диск не
+    сохраняется.
+    """
+
+    __slots__ = (
+        'key', 'current_timestamp', 'last_error', 'statuses', 'checked_at',
+    )
+
+    def __init__(self, key: str, current_timestamp: int = 0,
+                 last_error: str = None, statuses: dict = None):
+        """Создаёт состояние получателя с ключом key..."""
+        self.key = key
+        self.current_timestamp = current_timestamp
+        self.last_error = last_error
+        self.statuses = statuses or {}
+        self.checked_at = 0
+
+    def to_dict(self):
+        """Возвращает состояние в виде словаря для сохранения..."""
+        return {
+            'current_timestamp': self.current_timestamp,
+            'last_error': self.last_error,
+            'statuses': dict(self.statuses),
+        }
+
+
+class TenantStateCache:
+    """
+    Ограниченный кэш состояний получателей с вытеснением по LRU...
+    В памяти держится не более max_entries состояний. Каждое сохранение
+    пишется на диск, поэтому вытеснение бесплатно, а вытесненное
+    состояние лениво загружается из directory при следующем обращении.
+    Счётчики попаданий, промахов, загрузок и вытеснений возвращает stats().
+    """
+
+    def __init__(self, directory: str, max_entries: int):
+        """Создаёт кэш с файлами состояний в directory..."""
+        if max_entries < 1:
+            raise ValueError(f'Bad state cache size: {max_entries}')
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    @staticmethod
+    def tenant_key(tenant: str):
+        """Ключ состояния: хэш токена, чтобы токен не попал в имя файла..."""
+        return hashlib.sha256(str(tenant).encode()).hexdigest()[:32]
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, tenant: str):
+        """Возвращает состояние получателя, загружая его при промахе..."""
+        key = self.tenant_key(tenant)
+        with self._lock:
+            state = self._entries.get(key)
+            if state is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return state
+            self.misses += 1
+            path = self._path(key)
+            if os.path.exists(path):
+                self.loads += 1
+            stored = load_state(path, TenantState(key).to_dict())
+            state = TenantState(
+                key,
+                stored['current_timestamp'],
+                stored['last_error'],
+                stored['statuses'],
+            )
+            self._entries[key] = state
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return state
+
+    def save(self, state: TenantState):
+        """Сохраняет состояние на диск..."""
+        with self._lock:
+            save_state(self._path(state.key), state.to_dict())
+
+    def invalidate(self, tenant: str):
+        """Убирает состояние из памяти, чтобы перечитать его с диска..."""
+        with self._lock:
+            self._entries.pop(self.tenant_key(tenant), None)
+
+    def stats(self):
+        """Возвращает размер кэша и счётчики обращений..."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'loads': self.loads,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,57 @@
+from adaptive import AdaptiveLimiter
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAdaptiveLimiter:
+
+    def make_limiter(self, clock, initial=4):
+        return AdaptiveLimiter(
+            'fetch', initial, 1, 8, target_latency=1, cooldown=10,
+            clock=clock
+        )
+
+    def test_additive_increase(self):
+        limiter = self.make_limiter(FakeClock())
+        for _ in range(4):
+            with limiter.slot():
+                pass
+        assert limiter.snapshot()['limit'] == 4
+        for _ in range(20):
+            with limiter.slot():
+                pass
+        assert limiter.snapshot()['limit'] == 8, (
+            'Проверьте, что лимит растёт на единицу за окно и не выше максимума'
+        )
+
+    def test_multiplicative_decrease_with_cooldown(self):
+        clock = FakeClock()
+        limiter = self.make_limiter(clock, initial=8)
+        for _ in range(3):
+            with limiter.slot() as slot:
+                slot.mark_overload()
+        assert limiter.snapshot()['limit'] == 4, (
+            'Проверьте, что волна ошибок снижает лимит один раз за cooldown'
+        )
+        clock.now += 11
+        limiter.overload('loop lag')
+        assert limiter.snapshot()['limit'] == 2
+
+    def test_backpressure_when_full(self):
+        limiter = self.make_limiter(FakeClock(), initial=1)
+        assert limiter.acquire()
+        with limiter.slot(timeout=0.01) as slot:
+            assert slot is None
+        assert limiter.snapshot() == {
+            'limit': 1, 'in_flight': 1, 'waiting': 0, 'rejected': 1
+        }
+        limiter.release(latency=0)
+        with limiter.slot(timeout=0.01) as slot:
+            assert slot is not None
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+from commands import CommandPoller
+
+
+class FakeBot:
+
+    def __init__(self, updates):
+        self.updates = updates
+        self.offsets = []
+        self.sent = []
+
+    def get_updates(self, offset=None, timeout=0, **kwargs):
+        self.offsets.append(offset)
+        updates, self.updates = self.updates, []
+        return updates
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+def make_update(update_id, text, chat_id=1):
+    return SimpleNamespace(
+        update_id=update_id,
+        message=SimpleNamespace(text=text, chat_id=chat_id),
+    )
+
+
+class TestCommandPoller:
+
+    def make_poller(self, bot, tmp_path, burst=1):
+        return CommandPoller(
+            bot, {'/status': lambda chat_id: f'ok {chat_id}'},
+            str(tmp_path / 'offset.json'), [1], rate=0.001, burst=burst,
+            timeout=0
+        )
+
+    def test_status_answered_and_rate_limited(self, tmp_path):
+        bot = FakeBot([
+            make_update(10, '/status'),
+            make_update(11, '/status@homework_bot'),
+            make_update(12, 'hello'),
+            make_update(13, '/status', chat_id=2),
+        ])
+        poller = self.make_poller(bot, tmp_path)
+        poller.poll_once()
+        assert bot.sent == [('1', 'ok 1')], (
+            'Проверьте, что команды сверх лимита и из чужих чатов '
+            'игнорируются'
+        )
+        assert poller.offset == 14
+
+    def test_offset_is_shared_through_file(self, tmp_path):
+        bot = FakeBot([make_update(41, '/status')])
+        self.make_poller(bot, tmp_path).poll_once()
+        restarted = self.make_poller(FakeBot([]), tmp_path)
+        restarted.poll_once()
+        assert restarted.bot.offsets == [42], (
+            'Проверьте, что смещение getUpdates сохраняется между запусками'
+        )
+
+    def test_offset_reloaded_after_standby(self, tmp_path):
+        standby = self.make_poller(FakeBot([]), tmp_path)
+        self.make_poller(
+            FakeBot([make_update(41, '/status')]), tmp_path
+        ).poll_once()
+        states = iter([False, True])
+
+        def is_active():
+            try:
+                return next(states)
+            except StopIteration:
+                raise KeyboardInterrupt
+
+        try:
+            standby.run(is_active, idle_time=0)
+        except KeyboardInterrupt:
+            pass
+        assert standby.bot.offsets == [42], (
+            'Проверьте, что смещение перечитывается при переходе из standby '
+            'в активный режим'
+        )
+
+    def test_replies_go_through_send(self, tmp_path):
+        bot = FakeBot([make_update(1, '/status')])
+        replies = []
+        CommandPoller(
+            bot, {'/status': lambda chat_id: 'ok'},
+            str(tmp_path / 'offset.json'), [1], rate=1, burst=1, timeout=0,
+            send=lambda chat_id, text: replies.append((chat_id, text))
+        ).poll_once()
+        assert replies == [('1', 'ok')] and bot.sent == [], (
+            'Проверьте, что ответы на команды отправляются через send'
+        )
@@ -0,0 +1,171 @@
+from delivery import DeliveryQueue, DeliveryWorker, idempotency_key
+from exceptions import DeliveryDeferredError
+
+
+class FakeSender:
+
+    def __init__(self, online=True):
+        self.online = online
+        self.sent = []
+
+    def __call__(self, message, record):
+        if self.online:
+            self.sent.append(message)
+        return self.online
+
+
+class TestDeliveryQueue:
+
+    def test_failed_messages_survive_restart(self, tmp_path):
+        queue = DeliveryQueue(str(tmp_path))
+        queue.enqueue('first', idempotency_key('first'))
+        queue.enqueue('second', idempotency_key('second'))
+        failed = queue.flush(FakeSender(online=False))
+        assert failed['message'] == 'first'
+        assert failed['attempts'] == 1
+        sender = FakeSender()
+        assert DeliveryQueue(str(tmp_path)).flush(sender) is None
+        assert sender.sent == ['first', 'second'], (
+            'Проверьте, что сообщения доставляются после перезапуска '
+            'в порядке постановки'
+        )
+
+    def test_idempotency_key_deduplicates(self, tmp_path):
+        queue = DeliveryQueue(str(tmp_path))
+        key = idempotency_key('chat', 'hw1', 'approved')
+        queue.enqueue('verdict', key)
+        queue.enqueue('verdict', key)
+        sender = FakeSender()
+        queue.flush(sender)
+        queue.enqueue('verdict', key)
+        queue.flush(sender)
+        assert sender.sent == ['verdict'], (
+            'Проверьте, что сообщение с тем же ключом не отправляется дважды'
+        )
+        assert queue.stats() == {
+            'pending': 0, 'delivered': 1, 'failures': 0, 'dead': 0
+        }
+
+    def test_delivered_keys_are_shared(self, tmp_path):
+        leader = DeliveryQueue(str(tmp_path))
+        standby = DeliveryQueue(str(tmp_path))
+        key = idempotency_key('verdict')
+        leader.enqueue('verdict', key)
+        leader.flush(FakeSender())
+        standby.enqueue('verdict', key)
+        assert standby.stats()['pending'] == 0, (
+            'Проверьте, что доставленные ключи читаются с диска'
+        )
+
+    def test_send_runs_without_queue_lock(self, tmp_path):
+        queue = DeliveryQueue(str(tmp_path))
+        queue.enqueue('first', idempotency_key('first'))
+
+        def send(message, record):
+            queue.enqueue('second', idempotency_key('second'))
+            return True
+
+        assert queue.flush(send) is None
+        assert queue.stats()['pending'] == 1
+
+    def test_dead_letter_after_max_attempts(self, tmp_path):
+        queue = DeliveryQueue(str(tmp_path), max_attempts=2)
+        queue.enqueue('poison', idempotency_key('poison'))
+        queue.enqueue('next', idempotency_key('next'))
+        assert queue.flush(lambda message, record: False)['attempts'] == 1
+        sender = FakeSender()
+        assert queue.flush(
+            lambda message, record: message != 'poison' and sender(
+                message, record
+            )
+        ) is None
+        assert sender.sent == ['next'], (
+            'Проверьте, что сообщение после max_attempts неудач не '
+            'блокирует очередь'
+        )
+        assert len(list((tmp_path / 'dead').iterdir())) == 1
+        assert queue.stats()['dead'] == 1
+        queue.enqueue('poison', idempotency_key('poison'))
+        assert queue.stats()['pending'] == 0
+
+    def test_worker_backoff(self, tmp_path):
+        queue = DeliveryQueue(str(tmp_path))
+        queue.enqueue('message', idempotency_key('message'))
+        sender = FakeSender(online=False)
+        worker = DeliveryWorker(queue, sender, 5, 12)
+        delays = []
+        for _ in range(3):
+            worker.run_once()
+            delays.append(worker.delay)
+        assert delays == [10, 12, 12]
+        sender.online = True
+        assert worker.run_once()
+        assert worker.delay == 5
+
+    def test_worker_honours_retry_after(self, tmp_path):
+        queue = DeliveryQueue(str(tmp_path), max_attempts=1)
+        queue.enqueue('message', idempotency_key('message'))
+
+        def send(message, record):
+            raise DeliveryDeferredError(42)
+
+        worker = DeliveryWorker(queue, send, 5, 12)
+        assert not worker.run_once()
+        assert worker.delay == 42
+        assert queue.stats()['pending'] == 1, (
+            'Проверьте, что отложенная получателем отправка не считается '
+            'неудачной попыткой'
+        )
+        assert worker.stats()['sends'] == 1
+
+    def test_skips_messages_delivered_by_other_instance(self, tmp_path):
+        old_leader = DeliveryQueue(str(tmp_path))
+        new_leader = DeliveryQueue(str(tmp_path))
+        key = idempotency_key('verdict')
+        old_leader.enqueue('verdict', key)
+
+        def send(message, record):
+            new_leader.flush(FakeSender())
+            return True
+
+        assert old_leader.flush(send) is None, (
+            'Проверьте, что файл, удалённый другим экземпляром, считается '
+            'доставленным'
+        )
+        assert old_leader.stats()['pending'] == 0
+
+    def test_does_not_resend_delivered_key(self, tmp_path):
+        queue = DeliveryQueue(str(tmp_path))
+        key = idempotency_key('verdict')
+        queue.enqueue('verdict', key)
+        (tmp_path / 'delivered.json').write_text(f'{{"keys": ["{key}"]}}')
+        sender = FakeSender()
+        assert queue.flush(sender) is None
+        assert sender.sent == [], (
+            'Проверьте, что сообщение с доставленным ключом не отправляется'
+        )
+        assert queue.stats()['pending'] == 0
+
+    def test_worker_survives_queue_errors(self, tmp_path):
+        queue = DeliveryQueue(str(tmp_path))
+
+        def flush(send):
+            raise OSError('disk full')
+
+        queue.flush = flush
+        worker = DeliveryWorker(queue, FakeSender(), 0.001, 0.002)
+        states = iter([True, True])
+
+        def is_active():
+            try:
+                return next(states)
+            except StopIteration:
+                raise KeyboardInterrupt
+
+        try:
+            worker.run(is_active)
+        except KeyboardInterrupt:
+            pass
+        assert worker.delay == 0.002, (
+            'Проверьте, что ошибка очереди не останавливает доставщик'
+        )
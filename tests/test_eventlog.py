@@ -0,0 +1,123 @@
+import csv
+import io
+
+from eventlog import EventLog, export_csv, main
+
+
+class TestEventLog:
+
+    def test_records_only_transitions(self, tmp_path):
+        event_log = EventLog(str(tmp_path / 'events'))
+        assert event_log.record('hw1', 'reviewing', 'c1') is not None
+        assert event_log.record(
+            'hw1', 'reviewing', 'c1', from_status='reviewing'
+        ) is None, (
+            'Проверьте, что повторный статус не записывается как переход'
+        )
+        event = event_log.record(
+            'hw1', 'rejected', 'c1', from_status='reviewing'
+        )
+        assert (event.from_status, event.to_status) == (
+            'reviewing', 'rejected'
+        )
+        assert event_log.aggregates['events'] == 2
+
+    def test_snapshot_keeps_only_homeworks_in_review(self, tmp_path):
+        event_log = EventLog(str(tmp_path / 'events'), snapshot_step=1)
+        for number in range(50):
+            event_log.record(f'hw{number}', 'reviewing', 'c1')
+            event_log.record(
+                f'hw{number}', 'approved', 'c1', from_status='reviewing'
+            )
+        event_log.record('hw50', 'reviewing', 'c1')
+        assert event_log.aggregates['reviewing'].keys() == {'hw50'}, (
+            'Проверьте, что агрегаты не хранят историю проверенных работ'
+        )
+        assert event_log.stats()['in_review'] == 1
+        assert 'hw0' not in (tmp_path / 'events.agg.json').read_text()
+
+    def test_aggregates(self, tmp_path):
+        event_log = EventLog(str(tmp_path / 'events'))
+        event_log.record('hw1', 'reviewing', 'c1', '2020-02-13T10:00:00Z')
+        event_log.record(
+            'hw1', 'rejected', 'c1', '2020-02-13T12:00:00Z', 'reviewing'
+        )
+        event_log.record('hw2', 'reviewing', 'c1', '2020-02-13T10:00:00Z')
+        event_log.record(
+            'hw2', 'approved', 'c1', '2020-02-13T11:00:00Z', 'reviewing'
+        )
+        stats = event_log.stats()
+        assert stats['reviews'] == 2
+        assert stats['avg_reviewing_seconds'] == 5400
+        assert stats['cohorts']['c1']['approve_rate'] == 0.5
+        reopened = EventLog(str(tmp_path / 'events'))
+        assert reopened.stats() == stats, (
+            'Проверьте, что агрегаты восстанавливаются из снимка'
+        )
+
+    def test_replay_catches_up_after_lost_snapshot(self, tmp_path):
+        path = tmp_path / 'events'
+        event_log = EventLog(str(path), snapshot_step=1)
+        event_log.record('hw1', 'reviewing', 'c1')
+        event_log.record('hw1', 'approved', 'c1', from_status='reviewing')
+        (tmp_path / 'events.agg.json').unlink()
+        assert EventLog(str(path)).stats() == event_log.stats()
+
+    def test_snapshot_is_periodic(self, tmp_path):
+        path = tmp_path / 'events'
+        event_log = EventLog(str(path), snapshot_step=3)
+        event_log.record('hw1', 'reviewing', 'c1')
+        event_log.record('hw2', 'reviewing', 'c1')
+        assert not (tmp_path / 'events.agg.json').exists()
+        event_log.record('hw3', 'reviewing', 'c1')
+        event_log.record('hw3', 'approved', 'c1', from_status='reviewing')
+        assert EventLog(str(path)).stats() == event_log.stats(), (
+            'Проверьте, что события после снимка догоняются по журналу'
+        )
+
+    def test_instances_share_log(self, tmp_path):
+        path = str(tmp_path / 'events')
+        leader = EventLog(path)
+        standby = EventLog(path)
+        leader.record('hw1', 'reviewing', 'c1', '2020-02-13T10:00:00Z')
+        standby.record(
+            'hw1', 'approved', 'c1', '2020-02-13T11:00:00Z', 'reviewing'
+        )
+        assert standby.stats()['avg_reviewing_seconds'] == 3600, (
+            'Проверьте, что экземпляр догоняет события других экземпляров '
+            'перед записью'
+        )
+        leader.record('hw2', 'reviewing', 'c1')
+        assert leader.stats() == standby.stats()
+        assert leader.stats()['events'] == 3
+
+    def test_export_since_uses_index(self, tmp_path):
+        event_log = EventLog(str(tmp_path / 'events'), index_step=2)
+        events = [
+            event_log.record(f'hw{number}', 'reviewing', 'c1')
+            for number in range(10)
+        ]
+        since = events[6].recorded_at
+        output = io.StringIO()
+        assert export_csv(event_log.path, output, since) >= 4
+        rows = list(csv.reader(io.StringIO(output.getvalue())))
+        assert rows[0][0] == 'recorded_at'
+        assert all(float(row[0]) >= since for row in rows[1:])
+
+    def test_cli_export(self, tmp_path):
+        path = str(tmp_path / 'events')
+        EventLog(path).record('hw1', 'reviewing', 'c1')
+        output = tmp_path / 'out.csv'
+        main(['--log', path, 'export', '--output', str(output)])
+        assert len(output.read_text().splitlines()) == 2
+
+    def test_cli_does_not_write_log_files(self, tmp_path, capsys):
+        path = str(tmp_path / 'events')
+        EventLog(path, snapshot_step=1).record('hw1', 'reviewing', 'c1')
+        before = {
+            name.name: name.read_bytes() for name in tmp_path.iterdir()
+        }
+        main(['--log', path, 'export'])
+        main(['--log', path, 'stats'])
+        after = {name.name: name.read_bytes() for name in tmp_path.iterdir()}
+        assert after == before
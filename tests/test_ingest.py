@@ -0,0 +1,85 @@
+import http.client
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from ingest import INGEST_PATH, TOKEN_HEADER, IngestServer
+from records import parse_homeworks
+
+
+def post(server, payload, token=None):
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{server.port}{INGEST_PATH}',
+        data=json.dumps(payload).encode(),
+        headers={TOKEN_HEADER: token} if token else {},
+        method='POST',
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+class TestIngestServer:
+
+    @pytest.fixture
+    def received(self):
+        return []
+
+    @pytest.fixture
+    def server(self, received):
+        def callback(homeworks):
+            records = parse_homeworks({'homeworks': homeworks})
+            received.extend(records)
+            return len(records)
+
+        server = IngestServer(
+            '127.0.0.1', 0, callback, lambda: True, token='secret'
+        )
+        server.start()
+        yield server
+        server.stop()
+
+    def test_accepts_homeworks_list(self, server, received):
+        homework = {'homework_name': 'hw123', 'status': 'approved'}
+        assert post(server, [homework], 'secret') == (202, {'accepted': 1})
+        assert post(server, {'homeworks': [homework]}, 'secret')[0] == 202
+        assert [record.homework_name for record in received] == [
+            'hw123', 'hw123'
+        ]
+
+    def test_rejects_bad_payload_and_token(self, server, received):
+        assert post(server, [{'status': 'approved'}], 'secret')[0] == 400, (
+            'Проверьте, что некорректные работы отклоняются с кодом 400'
+        )
+        assert post(server, [], 'wrong')[0] == 403
+        assert received == []
+
+    def test_standby_rejects_push(self, server):
+        server._server.is_active = lambda: False
+        assert post(server, [], 'secret')[0] == 503
+
+    def test_callback_failure_returns_500(self, server):
+        def callback(homeworks):
+            raise OSError('disk full')
+
+        server._server.callback = callback
+        assert post(server, [], 'secret') == (
+            500, {'error': 'internal error'}
+        ), 'Проверьте, что сбой обработчика не обрывает соединение'
+
+    @pytest.mark.parametrize('length', ['-1', 'abc'])
+    def test_rejects_bad_content_length(self, server, received, length):
+        connection = http.client.HTTPConnection(
+            '127.0.0.1', server.port, timeout=5
+        )
+        connection.putrequest('POST', INGEST_PATH)
+        connection.putheader(TOKEN_HEADER, 'secret')
+        connection.putheader('Content-Length', length)
+        connection.endheaders()
+        assert connection.getresponse().status == 400
+        connection.close()
+        assert received == []
@@ -0,0 +1,56 @@
+from leader import LeaderLease
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLeaderLease:
+
+    def test_single_leader_and_failover(self, tmp_path):
+        clock = FakeClock()
+        path = str(tmp_path / 'lease.json')
+        active = LeaderLease(path, 30, owner='active', clock=clock)
+        standby = LeaderLease(path, 30, owner='standby', clock=clock)
+        assert active.try_acquire()
+        assert not standby.try_acquire(), (
+            'Проверьте, что аренду не может захватить второй экземпляр'
+        )
+        clock.now += 20
+        assert active.try_acquire(), 'Лидер должен продлевать аренду'
+        clock.now += 29
+        assert not standby.try_acquire()
+        clock.now += 2
+        assert standby.try_acquire(), (
+            'Проверьте, что резервный экземпляр забирает истёкшую аренду'
+        )
+        assert not active.try_acquire()
+        assert not active.is_leader
+
+    def test_release(self, tmp_path):
+        clock = FakeClock()
+        path = str(tmp_path / 'lease.json')
+        active = LeaderLease(path, 30, owner='active', clock=clock)
+        standby = LeaderLease(path, 30, owner='standby', clock=clock)
+        active.try_acquire()
+        active.release()
+        assert standby.try_acquire()
+
+    def test_leadership_expires_without_renewal(self, tmp_path):
+        clock = FakeClock()
+        path = str(tmp_path / 'lease.json')
+        active = LeaderLease(path, 30, owner='active', clock=clock)
+        standby = LeaderLease(path, 30, owner='standby', clock=clock)
+        active.try_acquire()
+        clock.now += 30
+        assert not active.is_leader, (
+            'Проверьте, что лидер без продления перестаёт считать себя '
+            'лидером по истечении аренды'
+        )
+        assert standby.try_acquire()
+        assert [active.is_leader, standby.is_leader] == [False, True]
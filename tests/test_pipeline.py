@@ -0,0 +1,248 @@
+import socket
+import time
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import RetryAfter
+
+import homework
+from adaptive import AdaptiveLimiter
+from delivery import DeliveryQueue
+from eventlog import EventLog, iter_events
+from exceptions import DeliveryDeferredError, HomeworkFormatError
+from ingest import IngestServer
+from records import HomeworkRecord
+from state import TenantState, TenantStateCache
+
+
+def make_record(status='approved', date_updated='2020-02-13T14:40:57Z'):
+    return HomeworkRecord('hw1', status, 1, date_updated)
+
+
+class FakeLease:
+
+    path = 'lease'
+    owner = 'test'
+
+    def __init__(self, held):
+        self.held = held
+
+    def try_acquire(self):
+        return self.held
+
+
+class FailingBot:
+
+    def __init__(self, error=None):
+        self.error = error
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.error is not None:
+            raise self.error
+        self.sent.append(text)
+
+
+class TestPollOnce:
+
+    @pytest.fixture
+    def outbox(self, tmp_path):
+        return DeliveryQueue(str(tmp_path / 'outbox'))
+
+    @pytest.fixture
+    def fetched(self, monkeypatch):
+        calls = []
+
+        def fetch_homeworks(current_timestamp):
+            calls.append(current_timestamp)
+            return {'current_date': 200}, (make_record(),)
+
+        monkeypatch.setattr(homework, 'fetch_homeworks', fetch_homeworks)
+        return calls
+
+    def test_cursor_advances_once_message_is_queued(self, outbox, fetched):
+        state = TenantState('key', current_timestamp=100)
+        homework.poll_once(outbox, state)
+        assert fetched == [100]
+        assert state.current_timestamp == 200, (
+            'Проверьте, что отметка времени сдвигается сразу после '
+            'постановки сообщения в очередь, до отправки'
+        )
+        assert state.statuses == {'hw1': 'approved'}
+        failed = outbox.flush(lambda message, record: False)
+        assert failed['message'] == homework.parse_status(make_record())
+
+    def test_transitions_use_known_statuses(self, outbox, fetched,
+                                            tmp_path):
+        event_log = EventLog(str(tmp_path / 'events'))
+        state = TenantState('key', statuses={'hw1': 'reviewing'})
+        homework.poll_once(outbox, state, event_log)
+        homework.poll_once(outbox, state, event_log)
+        events = [event for _, event in iter_events(event_log.path)]
+        assert [(e.from_status, e.to_status) for e in events] == [
+            ('reviewing', 'approved')
+        ], 'Проверьте, что переход записывается один раз'
+
+    def test_error_message_is_queued_once(self, outbox, monkeypatch):
+        def fetch_homeworks(current_timestamp):
+            raise ConnectionError('down')
+
+        monkeypatch.setattr(homework, 'fetch_homeworks', fetch_homeworks)
+        state = TenantState('key', current_timestamp=100)
+        homework.poll_once(outbox, state)
+        homework.poll_once(outbox, state)
+        assert state.current_timestamp == 100
+        assert 'down' in state.last_error
+        assert outbox.stats()['pending'] == 1, (
+            'Проверьте, что одна и та же ошибка отправляется один раз'
+        )
+
+    def test_lost_lease_blocks_side_effects(self, outbox, fetched):
+        state = TenantState('key', current_timestamp=100)
+        homework.poll_once(outbox, state, lease=FakeLease(held=False))
+        assert fetched == [100]
+        assert state.current_timestamp == 100
+        assert state.statuses == {}
+        assert outbox.stats()['pending'] == 0, (
+            'Проверьте, что после потери аренды итерация ничего не меняет'
+        )
+
+
+class TestDeliver:
+
+    def test_deliver_reports_result(self):
+        bot = FailingBot()
+        record = {'key': 'key', 'attempts': 0, 'trace': None}
+        assert homework.deliver(bot, 'text', record) is True
+        assert bot.sent == ['text']
+        assert homework.deliver(
+            FailingBot(ConnectionError('down')), 'text', record
+        ) is False
+
+    def test_retry_after_defers_delivery(self):
+        with pytest.raises(DeliveryDeferredError) as error:
+            homework.deliver(
+                FailingBot(RetryAfter(7)), 'text',
+                {'key': 'key', 'attempts': 0, 'trace': None}
+            )
+        assert error.value.retry_after == 7
+
+    def test_backpressure_defers_delivery(self, monkeypatch):
+        limiter = AdaptiveLimiter('send', 1, 1, 1, 1)
+        assert limiter.acquire()
+        monkeypatch.setattr(homework, 'SEND_LIMITER', limiter)
+        monkeypatch.setattr(homework, 'SLOT_TIMEOUT', 0)
+        with pytest.raises(DeliveryDeferredError):
+            homework.deliver(
+                FailingBot(), 'text',
+                {'key': 'key', 'attempts': 0, 'trace': None}
+            )
+
+    def test_verdict_key(self):
+        assert homework.verdict_key(make_record()) == homework.verdict_key(
+            SimpleNamespace(**make_record().to_dict())
+        )
+        assert homework.verdict_key(make_record()) != homework.verdict_key(
+            make_record(date_updated='2020-02-14T10:00:00Z')
+        ), 'Проверьте, что повторная проверка получает новый ключ'
+        assert homework.verdict_key(make_record()) != homework.verdict_key(
+            make_record('rejected')
+        )
+
+
+class TestAnswerStatus:
+
+    @pytest.fixture
+    def states(self, tmp_path):
+        return TenantStateCache(str(tmp_path / 'state'), 10)
+
+    def fetch_with(self, monkeypatch, result=None, error=None):
+        calls = []
+
+        def fetch_homeworks(current_timestamp):
+            calls.append(current_timestamp)
+            if error is not None:
+                raise error
+            return {}, result
+
+        monkeypatch.setattr(homework, 'fetch_homeworks', fetch_homeworks)
+        return calls
+
+    def test_answers_from_fresh_cache(self, states, monkeypatch):
+        calls = self.fetch_with(monkeypatch, (make_record('rejected'),))
+        state = states.get(homework.PRACTICUM_TOKEN)
+        state.statuses['hw1'] = 'approved'
+        state.checked_at = time.time()
+        answer = homework.answer_status(states, '1')
+        assert calls == [], (
+            'Проверьте, что свежий кэш отвечает без запроса к API'
+        )
+        assert homework.HOMEWORK_VERDICTS['approved'] in answer
+
+    def test_refreshes_and_saves_stale_cache(self, states, monkeypatch):
+        calls = self.fetch_with(monkeypatch, (make_record('rejected'),))
+        state = states.get(homework.PRACTICUM_TOKEN)
+        state.checked_at = time.time() - homework.STATUS_MAX_AGE - 1
+        answer = homework.answer_status(states, '1')
+        assert len(calls) == 1
+        assert homework.HOMEWORK_VERDICTS['rejected'] in answer
+        reloaded = TenantStateCache(states.directory, 10).get(
+            homework.PRACTICUM_TOKEN
+        )
+        assert reloaded.statuses == {'hw1': 'rejected'}, (
+            'Проверьте, что обновлённые статусы сохраняются на диск'
+        )
+
+    def test_falls_back_to_stale_cache(self, states, monkeypatch):
+        self.fetch_with(monkeypatch, error=ConnectionError('down'))
+        state = states.get(homework.PRACTICUM_TOKEN)
+        state.statuses['hw1'] = 'reviewing'
+        answer = homework.answer_status(states, '1')
+        assert homework.HOMEWORK_VERDICTS['reviewing'] in answer, (
+            'Проверьте, что при ошибке API ответ строится из кэша'
+        )
+
+
+class TestIngest:
+
+    @pytest.fixture
+    def pipeline(self, tmp_path):
+        outbox = DeliveryQueue(str(tmp_path / 'outbox'))
+        states = TenantStateCache(str(tmp_path / 'state'), 10)
+        worker = SimpleNamespace(wake=lambda: None)
+        return outbox, states, worker
+
+    def test_missing_date_updated_is_rejected(self, pipeline):
+        outbox, states, worker = pipeline
+        with pytest.raises(HomeworkFormatError):
+            homework.ingest_homeworks(outbox, states, None, worker, [
+                {'homework_name': 'hw1', 'status': 'approved'}
+            ])
+        assert outbox.stats()['pending'] == 0
+
+    def test_push_and_poll_share_verdict(self, pipeline, monkeypatch):
+        outbox, states, worker = pipeline
+        assert homework.ingest_homeworks(
+            outbox, states, None, worker, [make_record().to_dict()]
+        ) == 1
+        monkeypatch.setattr(
+            homework, 'fetch_homeworks',
+            lambda current_timestamp: ({}, (make_record(),))
+        )
+        homework.poll_once(outbox, states.get(homework.PRACTICUM_TOKEN))
+        assert outbox.stats()['pending'] == 1, (
+            'Проверьте, что вердикт из приёмника и из сверочного опроса '
+            'ставится в очередь один раз'
+        )
+
+    def test_busy_port_falls_back_to_polling(self):
+        with socket.socket() as busy:
+            busy.bind(('127.0.0.1', 0))
+            busy.listen()
+            ingest = IngestServer(
+                '127.0.0.1', busy.getsockname()[1], None, lambda: True
+            )
+            assert homework.start_ingest(ingest) == homework.RETRY_TIME, (
+                'Проверьте, что занятый порт не останавливает бота'
+            )
+            assert not ingest.running
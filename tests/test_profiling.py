@@ -0,0 +1,69 @@
+import pstats
+import threading
+
+import pytest
+
+from profiling import NULL_SPAN, LoopProfiler
+
+
+class TestLoopProfiler:
+
+    def test_disabled_profiler_is_noop(self, tmp_path):
+        profiler = LoopProfiler(str(tmp_path / '{timestamp}.prof'), 3)
+        assert profiler.iteration() is NULL_SPAN
+        assert profiler.span('fetch') is NULL_SPAN, (
+            'Проверьте, что выключенный профилировщик не создаёт объектов'
+        )
+
+    def test_armed_profiler_dumps_stats(self, tmp_path, caplog):
+        caplog.set_level('INFO')
+        profiler = LoopProfiler(str(tmp_path / '{timestamp}.prof'), 3)
+        profiler.arm(2)
+        for _ in range(3):
+            with profiler.iteration():
+                with profiler.span('fetch'):
+                    sum(range(1000))
+        dumps = list(tmp_path.glob('*.prof'))
+        assert len(dumps) == 1, (
+            'Проверьте, что статистика сохраняется после N итераций'
+        )
+        pstats.Stats(str(dumps[0]))
+        assert not profiler.active
+        timings = [
+            record.message for record in caplog.records
+            if record.message.startswith('Iteration timings')
+        ]
+        assert len(timings) == 2
+        assert 'fetch=' in timings[0]
+
+    def test_spans_from_other_threads_are_ignored(self, tmp_path):
+        profiler = LoopProfiler(str(tmp_path / '{timestamp}.prof'), 3)
+        profiler.arm(1)
+        spans = []
+        with profiler.iteration():
+            thread = threading.Thread(
+                target=lambda: spans.append(profiler.span('fetch'))
+            )
+            thread.start()
+            thread.join()
+            assert profiler.span('fetch') is not NULL_SPAN
+        assert spans == [NULL_SPAN], (
+            'Проверьте, что участки из других потоков не попадают в итерацию'
+        )
+
+    @pytest.mark.parametrize('template', [
+        'missing/{timestamp}.prof', '{unknown}.prof', '{}.prof',
+    ])
+    def test_dump_errors_do_not_escape(self, tmp_path, caplog, template):
+        profiler = LoopProfiler(str(tmp_path / template), 3)
+        profiler.arm(1)
+        with profiler.iteration():
+            sum(range(1000))
+        assert not profiler.active, (
+            'Проверьте, что ошибка сохранения профиля не ломает цикл'
+        )
+        assert 'Cannot save profile' in caplog.text
+        profiler.arm(1)
+        with profiler.iteration():
+            pass
+        assert not profiler.active
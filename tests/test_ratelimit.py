@@ -0,0 +1,59 @@
+from ratelimit import FileTokenBucket, TokenBucket
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket:
+
+    def test_burst_then_defer(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2, 3, clock=clock, sleep=clock.sleep)
+        waits = [bucket.acquire() for _ in range(5)]
+        assert waits == [0, 0, 0, 0.5, 0.5], (
+            'Проверьте, что запросы сверх burst откладываются на 1/rate'
+        )
+        stats = bucket.stats()
+        assert stats['requests'] == 5
+        assert stats['deferred'] == 2
+        assert stats['total_wait'] == 1.0
+
+    def test_concurrent_reservations_queue_up(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1, 1, clock=clock, sleep=lambda seconds: None)
+        assert [bucket.acquire() for _ in range(3)] == [0, 1, 2], (
+            'Проверьте, что отложенные запросы не получают один и тот же токен'
+        )
+
+    def test_try_acquire_does_not_wait(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1, 1, clock=clock, sleep=clock.sleep)
+        assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+        clock.now += 1
+        assert bucket.try_acquire()
+        assert clock.sleeps == []
+
+    def test_file_bucket_shared_between_instances(self, tmp_path):
+        clock = FakeClock()
+        path = str(tmp_path / 'rate.json')
+        first, second = (
+            FileTokenBucket(path, 1, 2, clock=clock, sleep=clock.sleep)
+            for _ in range(2)
+        )
+        assert first.acquire() == 0
+        assert second.acquire() == 0
+        assert first.acquire() == 1, (
+            'Проверьте, что ведра с одним файлом состояния делят бюджет'
+        )
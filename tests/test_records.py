@@ -0,0 +1,61 @@
+import pytest
+
+from exceptions import HomeworkFormatError
+from records import HomeworkRecord, parse_homeworks
+
+
+class TestHomeworkRecord:
+    HOMEWORK = {
+        'id': 123,
+        'status': 'approved',
+        'homework_name': 'hw123',
+        'reviewer_comment': 'Всё нравится',
+        'date_updated': '2020-02-13T14:40:57Z',
+        'lesson_name': 'Итоговый проект'
+    }
+
+    def test_parse_homeworks(self):
+        records = parse_homeworks({'homeworks': [self.HOMEWORK]})
+        assert records == (HomeworkRecord.from_dict(self.HOMEWORK),), (
+            'Проверьте, что parse_homeworks возвращает кортеж записей'
+        )
+        assert records[0].to_dict() == {
+            key: value for key, value in self.HOMEWORK.items()
+            if key != 'reviewer_comment'
+        }
+        assert not hasattr(records[0], '__dict__'), (
+            'Проверьте, что HomeworkRecord использует __slots__'
+        )
+
+    def test_status_is_interned(self):
+        first, second = parse_homeworks({'homeworks': [
+            {'homework_name': 'a', 'status': ''.join(['appr', 'oved'])},
+            {'homework_name': 'b', 'status': ''.join(['approv', 'ed'])},
+        ]})
+        assert first.status is second.status, (
+            'Проверьте, что строки статусов интернируются'
+        )
+
+    @pytest.mark.parametrize('response, error', [
+        ({}, ValueError),
+        ([{'homeworks': []}], TypeError),
+        ({'current_date': 1}, HomeworkFormatError),
+        ({'homeworks': {}}, TypeError),
+        ({'homeworks': [{'status': 'approved'}]}, HomeworkFormatError),
+        ({'homeworks': [{'homework_name': 1, 'status': 'x'}]}, TypeError),
+    ])
+    def test_parse_homeworks_errors(self, response, error):
+        with pytest.raises(error):
+            parse_homeworks(response)
+
+    def test_missing_key_is_key_error(self):
+        with pytest.raises(KeyError, match='homework #1'):
+            parse_homeworks({'homeworks': [
+                {'homework_name': 'a', 'status': 'approved'},
+                {'homework_name': 'b'},
+            ]})
+
+    def test_records_are_hashable(self):
+        first = HomeworkRecord.from_dict(self.HOMEWORK)
+        second = HomeworkRecord.from_dict(dict(self.HOMEWORK))
+        assert len({first, second}) == 1
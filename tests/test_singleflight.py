@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return ('response', ('record',))
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(flight.do(('token', 0), fetch))
+            )
+            for _ in range(5)
+        ]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while flight.stats()['requests'] < 5:
+            assert time.monotonic() < deadline, (
+                'Проверьте, что все запросы доходят до SingleFlight.do'
+            )
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        assert len(calls) == 1, (
+            'Проверьте, что одновременные одинаковые запросы объединяются'
+        )
+        assert len(results) == 5 and len({id(r) for r in results}) == 1
+        assert flight.stats()['dedup_ratio'] == 0.8
+
+    def test_errors_are_shared_and_not_cached(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ConnectionError('down')
+
+        with pytest.raises(ConnectionError):
+            flight.do('key', fail)
+        assert flight.do('key', lambda: 'ok') == 'ok'
+        assert flight.stats()['executions'] == 2
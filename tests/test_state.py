@@ -0,0 +1,42 @@
+from state import TenantStateCache, load_state, save_state
+
+
+class TestState:
+
+    def test_state_roundtrip(self, tmp_path):
+        path = str(tmp_path / 'state.json')
+        default = {'current_timestamp': 0, 'last_error': None}
+        assert load_state(path, default) == default
+        save_state(path, {'current_timestamp': 42})
+        assert load_state(path, default) == {
+            'current_timestamp': 42, 'last_error': None
+        }
+
+
+class TestTenantStateCache:
+
+    def test_lru_eviction_and_lazy_reload(self, tmp_path):
+        cache = TenantStateCache(str(tmp_path), max_entries=2)
+        first = cache.get('token1')
+        first.current_timestamp = 42
+        first.statuses['hw1'] = 'approved'
+        cache.save(first)
+        cache.get('token2')
+        cache.get('token1')
+        cache.get('token3')
+        assert cache.stats()['evictions'] == 1
+        assert cache.stats()['entries'] == 2
+        cache.get('token4')
+        reloaded = cache.get('token1')
+        assert reloaded is not first
+        assert reloaded.current_timestamp == 42, (
+            'Проверьте, что вытесненное состояние загружается с диска'
+        )
+        assert reloaded.statuses == {'hw1': 'approved'}
+        stats = cache.stats()
+        assert (stats['hits'], stats['misses'], stats['loads']) == (1, 5, 1)
+
+    def test_token_not_in_file_name(self, tmp_path):
+        cache = TenantStateCache(str(tmp_path), max_entries=1)
+        cache.save(cache.get('secret-token'))
+        assert not any('secret' in path.name for path in tmp_path.iterdir())
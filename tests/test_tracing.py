@@ -0,0 +1,52 @@
+import json
+import logging
+from inspect import signature
+
+import pytest
+
+import tracing
+
+
+class TestTracing:
+
+    def test_spans_share_trace_and_export(self, tmp_path):
+        path = tmp_path / 'traces.jsonl'
+        tracing.configure(str(path))
+        try:
+            with tracing.span('poll') as root:
+                with tracing.span('parse_status'):
+                    tracing.set_attributes({
+                        'homework.name': 'hw123',
+                        'homework.date_updated': None,
+                    })
+                with pytest.raises(ValueError):
+                    with tracing.span('send_message'):
+                        raise ValueError('boom')
+        finally:
+            tracing.configure(None)
+        spans = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [span['name'] for span in spans] == [
+            'parse_status', 'send_message', 'poll'
+        ]
+        assert {span['traceId'] for span in spans} == {root.trace_id}, (
+            'Проверьте, что дочерние span наследуют trace_id'
+        )
+        assert spans[0]['parentSpanId'] == root.span_id
+        assert spans[0]['attributes'] == [
+            {'key': 'homework.name', 'value': {'stringValue': 'hw123'}}
+        ]
+        assert spans[1]['status']['code'] == tracing.STATUS_CODE_ERROR
+        for span in spans:
+            assert (
+                int(span['startTimeUnixNano']) <= int(span['endTimeUnixNano'])
+            )
+
+    def test_traced_keeps_signature_and_logs_trace_id(self):
+        @tracing.traced('work')
+        def work(first, second):
+            record = logging.LogRecord('x', logging.INFO, '', 0, '', (), None)
+            tracing.TraceContextFilter().filter(record)
+            return record.trace_id
+
+        assert len(signature(work).parameters) == 2
+        assert work(1, 2) != tracing.NO_TRACE
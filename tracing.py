@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+
+NO_TRACE = '-'
+SPAN_KIND_INTERNAL = 1
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+EXPORT_ERROR_TEMPLATE = 'Cannot export span to {path}. Error: {error}'
+
+_current_span = ContextVar('current_span', default=None)
+_exporter = None
+SpanContext = namedtuple('SpanContext', ('trace_id', 'span_id'))
+
+
+class Span:
+    """
+    Участок трассы с временными метками в наносекундах Unix...
+    В JSONL выгружается в форме span из OTLP/JSON OpenTelemetry, поэтому
+    файл можно разбирать стандартными инструментами.
+    """
+
+    __slots__ = (
+        'trace_id', 'span_id', 'parent_span_id', 'name',
+        'start_time', 'end_time', 'attributes', 'error',
+    )
+
+    def __init__(self, name: str, parent=None):
+        """Создаёт span, дочерний для parent, или корень новой трассы..."""
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent else ''
+        self.name = name
+        self.start_time = time.time_ns()
+        self.end_time = None
+        self.attributes = {}
+        self.error = None
+
+    def to_otlp(self):
+        """Возвращает span в форме OTLP/JSON..."""
+        status = {'code': STATUS_CODE_OK}
+        if self.error is not None:
+            status = {'code': STATUS_CODE_ERROR, 'message': self.error}
+        return {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'parentSpanId': self.parent_span_id,
+            'name': self.name,
+            'kind': SPAN_KIND_INTERNAL,
+            'startTimeUnixNano': str(self.start_time),
+            'endTimeUnixNano': str(self.end_time),
+            'attributes': [
+                {'key': key, 'value': otlp_value(value)}
+                for key, value in self.attributes.items()
+                if value is not None
+            ],
+            'status': status,
+        }
+
+
+def otlp_value(value):
+    """Кодирует значение атрибута в AnyValue из OTLP/JSON..."""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class JsonlSpanExporter:
+    """Дописывает завершённые span в JSONL-файл, по строке на span..."""
+
+    def __init__(self, path: str):
+        """Создаёт экспортёр в файл path..."""
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        """Записывает span в файл. Ошибки записи только логируются..."""
+        line = json.dumps(span.to_otlp(), ensure_ascii=False)
+        try:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as file:
+                file.write(line + '\n')
+        except OSError as error:
+            logging.warning(EXPORT_ERROR_TEMPLATE.format(
+                path=self.path,
+                error=error
+            ))
+
+
+def configure(path: str):
+    """Включает выгрузку span в файл path. Пустой path её выключает..."""
+    global _exporter
+    _exporter = JsonlSpanExporter(path) if path else None
+
+
+@contextmanager
+def span(name: str, attributes: dict = None, parent: SpanContext = None):
+    """
+    Открывает span, дочерний для parent или текущего span, либо новую...
+    трассу, если родителя нет. Исключение помечает span ошибкой и
+    пробрасывается.
+    """
+    current = Span(name, parent or _current_span.get())
+    if attributes:
+        current.attributes.update(attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as error:
+        current.error = repr(error)
+        raise
+    finally:
+        current.end_time = time.time_ns()
+        _current_span.reset(token)
+        if _exporter is not None:
+            _exporter.export(current)
+
+
+def traced(name: str):
+    """Декоратор, выполняющий функцию внутри span с именем name..."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_context():
+    """
+    Возвращает SpanContext текущего span, чтобы продолжить трассу...
+    в другом потоке или процессе, или None.
+    """
+    current = _current_span.get()
+    if current is None:
+        return None
+    return SpanContext(current.trace_id, current.span_id)
+
+
+def set_attributes(attributes: dict):
+    """Добавляет атрибуты к текущему span, если он есть..."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def record_error(error):
+    """Помечает текущий span ошибкой без проброса исключения..."""
+    current = _current_span.get()
+    if current is not None:
+        current.error = repr(error)
+
+
+class TraceContextFilter(logging.Filter):
+    """Добавляет в записи лога trace_id и span_id текущего span..."""
+
+    def filter(self, record):
+        """Заполняет поля trace_id и span_id записи..."""
+        current = _current_span.get()
+        record.trace_id = current.trace_id if current else NO_TRACE
+        record.span_id = current.span_id if current else NO_TRACE
+        return True